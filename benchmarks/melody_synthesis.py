@@ -0,0 +1,129 @@
+# Micro-benchmark for the chime synthesis engine in inventree_tui.sound.generation.
+#
+# Compares the vectorized float32 renderer with the previous per-note float64
+# implementation (kept below as a reference), for the built-in chimes and for
+# a batch of generated cues. Run it on the target hardware with:
+#
+#   python benchmarks/melody_synthesis.py [--repeat N] [--batch N]
+#
+# No audio device is needed: the mixer is never opened.
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from inventree_tui.sound.generation import (  # pylint: disable=wrong-import-position
+    ADSREnvelope,
+    Melody,
+    Note,
+    SineGenerator,
+    SquareGenerator,
+    render_melodies,
+)
+
+# Fixed, so the melodies do not open the mixer to ask for its rate
+SAMPLE_RATE = 44100
+
+# The previous implementation: one float64 array per note and envelope,
+# mixed in a Python loop
+def reference_envelope(adsr, total_samples, sample_rate):
+    attack_samples = int(adsr.attack_ms * sample_rate / 1000)
+    decay_samples = int(adsr.decay_ms * sample_rate / 1000)
+    release_samples = int(adsr.release_ms * sample_rate / 1000)
+    sustain_samples = max(0, total_samples - attack_samples - decay_samples - release_samples)
+    envelope = np.zeros(total_samples)
+    attack_end = min(attack_samples, total_samples)
+    envelope[:attack_end] = np.linspace(0, 1, attack_end)
+    if attack_end < total_samples:
+        decay_end = min(attack_samples + decay_samples, total_samples)
+        envelope[attack_end:decay_end] = np.linspace(1, adsr.sustain_level, decay_end - attack_end)
+        if decay_end < total_samples:
+            sustain_end = min(attack_samples + decay_samples + sustain_samples, total_samples)
+            envelope[decay_end:sustain_end] = adsr.sustain_level
+            if sustain_end < total_samples:
+                envelope[sustain_end:] = np.linspace(adsr.sustain_level, 0, total_samples - sustain_end)
+    return envelope
+
+def reference_wave(generator, frequency, duration_ms, sample_rate):
+    t = np.linspace(0, duration_ms / 1000, int(sample_rate * duration_ms / 1000), False)
+    if isinstance(generator, SquareGenerator):
+        return np.sign(np.sin(2 * np.pi * frequency * t) - (2 * generator.duty_cycle - 1)) / 2
+    return np.sin(2 * np.pi * frequency * t)
+
+def reference_generate(melody):
+    sample_rate = melody.sample_rate
+    melody_samples = np.zeros(melody.length())
+    for note, start_time_ms in melody.notes:
+        total_duration_ms = note.duration_ms + note.adsr.release_ms
+        wave = reference_wave(note.generator, note.frequency, total_duration_ms, sample_rate)
+        note_samples = wave * reference_envelope(note.adsr, len(wave), sample_rate)
+        start_sample = int(start_time_ms * sample_rate / 1000)
+        end_sample = start_sample + int(total_duration_ms * sample_rate / 1000)
+        melody_samples[start_sample:end_sample] += note_samples[:end_sample - start_sample]
+    max_amplitude = np.max(np.abs(melody_samples))
+    if max_amplitude > 1:
+        melody_samples /= max_amplitude
+    return melody_samples
+
+def chime_melodies():
+    sine_gen = SineGenerator()
+    square_gen = SquareGenerator()
+    short_env = ADSREnvelope(attack_ms=20, decay_ms=30, sustain_level=0.9, release_ms=80)
+    long_env = ADSREnvelope(attack_ms=30, decay_ms=100, sustain_level=0.8, release_ms=200)
+    failure_env = ADSREnvelope(attack_ms=20, decay_ms=30, sustain_level=0.9, release_ms=20)
+
+    success = Melody(SAMPLE_RATE)
+    success.add_note(Note(261.63 * 1.3, 80, short_env, sine_gen), 0)
+    success.add_note(Note(329.63 * 1.3, 80, short_env, sine_gen), 80)
+    success.add_note(Note(392.00 * 1.3, 300, long_env, sine_gen), 160)
+
+    failure = Melody(SAMPLE_RATE)
+    for start in (0, 160):
+        failure.add_note(Note(392.00, 100, failure_env, sine_gen), start)
+        failure.add_note(Note(415.30, 100, failure_env, square_gen), start)
+
+    return {"success": success, "failure": failure}
+
+# Per-location tones and counting beeps: short cues with varying pitch
+def cue_batch(count):
+    env = ADSREnvelope(attack_ms=5, decay_ms=20, sustain_level=0.7, release_ms=40)
+    generator = SineGenerator()
+    melodies = []
+    for i in range(count):
+        melody = Melody(SAMPLE_RATE)
+        base = 440 * 2 ** ((i % 24) / 12)
+        melody.add_note(Note(base, 60, env, generator), 0)
+        melody.add_note(Note(base * 1.5, 60, env, generator), 70)
+        melodies.append(melody)
+    return melodies
+
+def report(name, reference_s, vectorized_s, repeat):
+    print(f"{name:<22} reference {reference_s / repeat * 1000:8.3f} ms"
+          f"   vectorized {vectorized_s / repeat * 1000:8.3f} ms"
+          f"   speedup {reference_s / vectorized_s:5.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the chime synthesis engine")
+    parser.add_argument("--repeat", type=int, default=200, help="Iterations per measurement (default: 200)")
+    parser.add_argument("--batch", type=int, default=50, help="Number of cues in the batch test (default: 50)")
+    args = parser.parse_args()
+
+    for name, melody in chime_melodies().items():
+        error = np.max(np.abs(reference_generate(melody) - melody.generate()))
+        reference_s = timeit.timeit(lambda melody=melody: reference_generate(melody), number=args.repeat)
+        vectorized_s = timeit.timeit(melody.generate, number=args.repeat)
+        report(f"{name} chime", reference_s, vectorized_s, args.repeat)
+        print(f"{'':<22} max difference to reference: {error:.2e}")
+
+    melodies = cue_batch(args.batch)
+    repeat = max(1, args.repeat // 10)
+    reference_s = timeit.timeit(lambda: [reference_generate(m) for m in melodies], number=repeat)
+    vectorized_s = timeit.timeit(lambda: render_melodies(melodies), number=repeat)
+    report(f"batch of {args.batch} cues", reference_s, vectorized_s, repeat)
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,49 @@ from __future__ import annotations
 import json
 import logging
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict
 
 from inventree.stock import StockItem, StockLocation
 from pydantic import BaseModel, PrivateAttr
 from pydantic.fields import Field, FieldInfo
 
-from .base import api, ApiException
+from .base import api, ApiException, NETWORK_ERRORS
+from .object_cache import object_cache, ObjectCache
+from .location_tree import location_tree, LocationTree
+from .async_client import async_api, AsyncApi, requests_in_flight
 from .stock_item import CachedStockItem
+from .operations import set_default_locations
+from .journal import (
+    submit_stock_adjustment,
+    submit_default_locations,
+    start_journal,
+    stop_journal,
+    writes_are_queued,
+    UnconfirmedOperationError,
+)
 from .part_search import CachedPart
 from .scanner import InventreeScanner, WhitelistException
 
 
 class RowBaseModel(BaseModel):
+    # Called with the row and the field name whenever a field is assigned,
+    # so tables only refresh the rows that changed
+    _observers : List[Callable[[RowBaseModel, str], None]] = PrivateAttr(default_factory=list)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            for observer in list(self._observers):
+                observer(self, name)
+
+    def add_observer(self, observer: Callable[[RowBaseModel, str], None]):
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def remove_observer(self, observer: Callable[[RowBaseModel, str], None]):
+        if observer in self._observers:
+            self._observers.remove(observer)
+
     @classmethod
     def get_field_names(cls, by_alias=False) -> list[str]:
         field_names = []
@@ -98,18 +128,30 @@ def transfer_items(items: List[CachedStockItem], location: StockLocation, defaul
 
 
     s = "s" if len(items) > 1 else ""
-    messages = [f"Transferred {len(items)} stock item{s} to {location.name}."]
+    queued = writes_are_queued()
+    if queued:
+        messages = [f"Queued transfer of {len(items)} stock item{s} to {location.name}."]
+    else:
+        messages = [f"Transferred {len(items)} stock item{s} to {location.name}."]
 
     if default_location:
+        # Several items often share a part, only update each part once
+        parts = {}
         for item in items:
-            if item.part.default_location == location.pk:
-                continue
-            #item.part.default_location = location.pk
-            item.part.save(data={"default_location": location.pk})
-        messages.append(f"Default location{s} updated.")
+            if item.part.default_location != location.pk:
+                parts[item.part.pk] = item.part
+
+        errors = submit_default_locations(list(parts.keys()), location.pk)
+        if queued:
+            messages.append(f"Default location update{s} queued.")
+        elif len(errors) > 0:
+            names = ", ".join(parts[pk].name for pk in errors)
+            messages.append(f"Failed to update default location for: {names}.")
+        else:
+            messages.append(f"Default location{s} updated.")
 
     if len(_items) > 0:
-        StockItem.adjustStockItems(api, method='transfer', items=_items, location=location.pk)
+        submit_stock_adjustment('transfer', _items, location=location.pk)
 
     return " ".join(messages)
 
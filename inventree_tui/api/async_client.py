@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from importlib.util import find_spec
+from threading import Lock
+from typing import Any, Dict, List, Type, TypeVar
+from weakref import WeakKeyDictionary
+
+import httpx
+from inventree.api import InvenTreeAPI
+from inventree.base import InventreeObject
+
+from inventree_tui.settings import settings
+from .base import api, ApiException
+from .single_flight import AsyncSingleFlight, request_key
+
+T = TypeVar('T', bound=InventreeObject)
+
+# Asynchronous counterpart to the blocking InvenTreeAPI, used for searches.
+# Requests share a pooled, keep-alive httpx.AsyncClient, so workers running on
+# the event loop can issue many calls concurrently without a thread each.
+# Returned objects are regular inventree-python objects bound to the blocking
+# api, so they can be used with the rest of the code as usual.
+class AsyncApi():
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+        sync_api: InvenTreeAPI,
+        timeout: float = 10,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 10,
+        http2: bool = False,
+    ):
+        self.sync_api = sync_api
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.http2 = http2 and self.http2_available()
+        if http2 and not self.http2:
+            logging.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+
+        self.single_flight = AsyncSingleFlight()
+        # Number of requests waiting on the server, across all event loops
+        self.in_flight = 0
+        self._in_flight_lock = Lock()
+
+        # httpx clients are bound to the event loop they were created on
+        self._clients : WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = WeakKeyDictionary()
+
+    @staticmethod
+    def http2_available() -> bool:
+        return find_spec("h2") is not None
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Accept": "application/json"}
+        if self.sync_api.token:
+            headers["AUTHORIZATION"] = f"Token {self.sync_api.token}"
+        return headers
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.sync_api.api_url,
+                headers=self._headers(),
+                timeout=httpx.Timeout(self.timeout),
+                limits=self.limits,
+                http2=self.http2,
+                verify=self.sync_api.strict,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def request(self, method: str, url: str, timeout: float | None = None, **kwargs) -> Any:
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        with self._in_flight_lock:
+            self.in_flight += 1
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.TimeoutException as e:
+            raise ApiException(f"Request timed out: {method} {url}") from e
+        except httpx.HTTPError as e:
+            raise ApiException(f"Request failed: {method} {url}: {e}") from e
+        finally:
+            with self._in_flight_lock:
+                self.in_flight -= 1
+
+        if response.status_code >= 300:
+            raise ApiException(response.text, status_code=response.status_code)
+
+        try:
+            return response.json()
+        except ValueError as e:
+            # e.g. a captive portal or proxy error page
+            raise ApiException(f"Invalid JSON response: {method} {url}", status_code=response.status_code) from e
+
+    # Identical GETs already in flight are shared rather than sent again
+    async def get(self, url: str, params: Dict[str, Any] | None = None, timeout: float | None = None) -> Any:
+        key = request_key(url, params=params)
+        return await self.single_flight.do(
+            key,
+            lambda: self.request("GET", url, params=params, timeout=timeout)
+        )
+
+    # Equivalent of cls.list(api, **kwargs)
+    async def list(self, cls: Type[T], timeout: float | None = None, **kwargs) -> List[T]:
+        response = await self.get(cls.URL, params=kwargs, timeout=timeout)
+        if isinstance(response, dict):
+            response = response.get("results") or []
+        pk_field = cls.getPkField()
+        return [cls(self.sync_api, data=data) for data in response if pk_field in data]
+
+    # Closes the client belonging to the running event loop
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+async_api = AsyncApi(
+    api,
+    timeout=settings.api_client.timeout_seconds,
+    max_connections=settings.api_client.max_connections,
+    max_keepalive_connections=settings.api_client.max_keepalive_connections,
+    http2=settings.api_client.http2,
+)
+
+# Whether the blocking or the async client is waiting on the server
+def requests_in_flight() -> bool:
+    return api.in_flight > 0 or async_api.in_flight > 0
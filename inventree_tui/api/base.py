@@ -1,11 +1,15 @@
+import logging
 import os
 import sys
+from threading import Lock, RLock
 
-from typing import Generic, TypeVar, Type
+from typing import Callable, Generic, List, TypeVar, Type
 from inventree.api import InvenTreeAPI
 from inventree.base import InventreeObject
 from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from requests.exceptions import RequestException
 from inventree_tui.settings import settings
+from .single_flight import SingleFlight, request_key
 
 class ApiException(Exception):
     def __init__(self, message, status_code=None):
@@ -16,6 +20,10 @@ class ApiException(Exception):
     def __str__(self):
         return f'{self.message} (Status Code: {self.status_code})'
 
+# Errors raised when the server cannot be reached or rejects a request.
+# Background work catches these and tries again later instead of failing.
+NETWORK_ERRORS = (ConnectionError, RequestException, ApiException)
+
 host = settings.inventree_api_host
 token = settings.inventree_api_token
 
@@ -37,7 +45,58 @@ if not host or not token:
 
     sys.exit(1)
 
-api = InvenTreeAPI(host=host, token=token)
+CONNECTION_STATES = ["disconnected", "connecting", "connected", "failed"]
+
+# InvenTreeAPI that shares identical GET requests already in flight,
+# e.g. several row workers reloading the same stock item at once.
+# It is created without connecting; the first request (or an explicit
+# connect() from a background worker) connects, exactly once.
+class CoalescingInvenTreeAPI(InvenTreeAPI):
+    def __init__(self, *args, **kwargs):
+        self.single_flight = SingleFlight()
+        self.connection_state = "disconnected"
+        # Number of requests waiting on the server
+        self.in_flight = 0
+        self._in_flight_lock = Lock()
+        self._connect_lock = RLock()
+        self._state_listeners : List[Callable[[str], None]] = []
+        super().__init__(*args, **kwargs)
+
+    def add_state_listener(self, listener: Callable[[str], None]):
+        self._state_listeners.append(listener)
+
+    def _set_state(self, state: str):
+        self.connection_state = state
+        for listener in self._state_listeners:
+            listener(state)
+
+    def connect(self):
+        with self._connect_lock:
+            if self.connected:
+                return
+            self._set_state("connecting")
+            try:
+                super().connect()
+            except Exception as e:
+                logging.warning("Could not connect to %s: %s", self.base_url, e)
+                self._set_state("failed")
+                raise
+            self._set_state("connected" if self.connected else "failed")
+
+    def request(self, url: str, **kwargs):
+        with self._in_flight_lock:
+            self.in_flight += 1
+        try:
+            return super().request(url, **kwargs)
+        finally:
+            with self._in_flight_lock:
+                self.in_flight -= 1
+
+    def get(self, url: str, **kwargs):
+        key = request_key(url, **kwargs)
+        return self.single_flight.do(key, lambda: super(CoalescingInvenTreeAPI, self).get(url, **kwargs))
+
+api = CoalescingInvenTreeAPI(host=host, token=token, connect=False)
 
 T = TypeVar('T', bound=InventreeObject)
 class CachedInventreeObject(BaseModel, Generic[T]):
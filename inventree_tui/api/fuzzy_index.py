@@ -0,0 +1,64 @@
+import heapq
+from collections import Counter
+from typing import Dict, Generic, Hashable, List, Set, Tuple, TypeVar
+
+T = TypeVar('T')
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text.lower().strip()} "
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+# In-memory trigram index for fuzzy matching short names (e.g. locations)
+# without a server round trip. Candidates are found through the trigram
+# postings, scored by trigram overlap and ranked with a top-k selection.
+class TrigramIndex(Generic[T]):
+    def __init__(self):
+        self._items : Dict[Hashable, Tuple[str, Set[str], T]] = {}
+        self._postings : Dict[str, Set[Hashable]] = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, key: Hashable, text: str, item: T):
+        self.remove(key)
+        grams = trigrams(text)
+        self._items[key] = (text.lower(), grams, item)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: Hashable):
+        entry = self._items.pop(key, None)
+        if entry is None:
+            return
+        for gram in entry[1]:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(key)
+                if len(posting) == 0:
+                    del self._postings[gram]
+
+    def clear(self):
+        self._items.clear()
+        self._postings.clear()
+
+    def search(self, query: str, limit: int = 10) -> List[T]:
+        query_grams = trigrams(query)
+        query = query.lower().strip()
+        if len(query) == 0:
+            return []
+
+        shared : Counter = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+
+        def score(key):
+            text, grams, _ = self._items[key]
+            common = shared[key]
+            similarity = common / (len(query_grams) + len(grams) - common)
+            # Prefer names that contain the query as typed
+            if query in text:
+                similarity += 0.5 if text.startswith(query) else 0.25
+            return similarity
+
+        best = heapq.nlargest(limit, shared.keys(), key=score)
+        return [self._items[key][2] for key in best]
@@ -0,0 +1,354 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List
+
+from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout, HTTPError
+from urllib3.exceptions import ConnectTimeoutError
+
+from inventree_tui.settings import settings
+from .operations import adjust_stock_items, set_default_locations
+
+ADJUST_METHODS = ["count", "add", "remove", "transfer"]
+DEFAULT_LOCATION_METHOD = "default_location"
+# Applying these twice changes the stock twice. The server has no way to
+# deduplicate requests, so they are not retried when it is unknown whether
+# the previous attempt was applied.
+NON_IDEMPOTENT_METHODS = ["add", "remove", "transfer"]
+
+@dataclass
+class JournalOperation:
+    id: int
+    key: str
+    method: str
+    payload: Dict[str, Any]
+    attempts: int
+
+    def batch_key(self) -> str:
+        # Operations can only be batched with the same method and arguments
+        args = {k: v for k, v in self.payload.items() if k not in ("items", "part")}
+        return json.dumps([self.method, args], sort_keys=True)
+
+    def pks(self) -> List[int]:
+        if self.method == DEFAULT_LOCATION_METHOD:
+            return [self.payload["part"]]
+        return [i["pk"] for i in self.payload["items"]]
+
+def default_journal_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".local", "share", "inventree-tui", "journal.sqlite3")
+
+# Durable, ordered log of write operations, backed by SQLite.
+# Every operation is recorded before it is sent, so nothing is lost if the
+# connection drops or the application is closed.
+class OperationJournal():
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS operations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                method TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS operations_status ON operations (status, id)")
+
+    # Records an operation and returns its key, which is only used locally.
+    # Recording the same key twice has no effect.
+    def enqueue(self, method: str, payload: Dict[str, Any], key: str | None = None) -> str:
+        key = key if key is not None else uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO operations (key, method, payload, created, updated) VALUES (?, ?, ?, ?, ?)",
+                (key, method, json.dumps(payload), now, now)
+            )
+        return key
+
+    def pending(self, limit: int = 100) -> List[JournalOperation]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, key, method, payload, attempts FROM operations WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [JournalOperation(id=r[0], key=r[1], method=r[2], payload=json.loads(r[3]), attempts=r[4]) for r in rows]
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM operations WHERE status = 'pending'").fetchone()[0]
+
+    def _set_status(self, ops: List[JournalOperation], status: str, error: str | None = None, attempt: bool = True):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE operations SET status = ?, attempts = attempts + ?, last_error = ?, updated = ? WHERE id = ?",
+                [(status, 1 if attempt else 0, error, time.time(), op.id) for op in ops]
+            )
+
+    def mark_done(self, ops: List[JournalOperation]):
+        self._set_status(ops, "done")
+
+    def mark_failed(self, ops: List[JournalOperation], error: str):
+        self._set_status(ops, "failed", error)
+
+    def mark_retry(self, ops: List[JournalOperation], error: str):
+        self._set_status(ops, "pending", error)
+
+    # The operation may or may not have been applied, it needs checking by hand
+    def mark_unconfirmed(self, ops: List[JournalOperation], error: str):
+        self._set_status(ops, "unconfirmed", error)
+
+    # Removes completed operations older than max_age_seconds
+    def prune(self, max_age_seconds: float = 7 * 24 * 3600):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM operations WHERE status = 'done' AND updated < ?",
+                (time.time() - max_age_seconds,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Raised when only some operations of a batch failed
+class PartialBatchError(Exception):
+    def __init__(self, ops: List[JournalOperation], error: Exception):
+        self.ops = ops
+        self.error = error
+        super().__init__(str(error))
+
+# Passed to on_failed when an operation was not retried because it may
+# already have been applied
+class UnconfirmedOperationError(Exception):
+    def __init__(self, error: Exception):
+        self.error = error
+        super().__init__(f"The server did not confirm the operation, it may or may not have been applied: {error}")
+
+def http_status(e: Exception) -> int | None:
+    if not isinstance(e, HTTPError):
+        return None
+    if e.response is not None:
+        return e.response.status_code
+    detail = e.args[0] if len(e.args) > 0 else None
+    return detail.get("status_code") if isinstance(detail, dict) else None
+
+# Errors the server will keep returning no matter how often we retry
+def is_permanent_error(e: Exception) -> bool:
+    status = http_status(e)
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+# Whether the request may have been applied even though it failed: the
+# connection broke or timed out after the request was sent, or a gateway
+# gave up waiting on the server
+def is_ambiguous_error(e: Exception) -> bool:
+    # Raised by api.connect(), before anything is sent
+    if isinstance(e, ConnectionError):
+        return False
+    if isinstance(e, ConnectTimeout):
+        return False
+    if isinstance(e, RequestsConnectionError):
+        reason = getattr(e.args[0], "reason", None) if len(e.args) > 0 else None
+        return not isinstance(reason, ConnectTimeoutError)
+    status = http_status(e)
+    if status is not None:
+        return status in (502, 504)
+    return True
+
+# Background thread submitting journaled operations in order.
+# Consecutive compatible operations are sent as one batch. If the server
+# rejects a batch, its operations are sent again one at a time, so only the
+# offending one fails. Failures caused by connectivity are retried with
+# exponential backoff, unless a non-idempotent operation may already have
+# been applied; those are marked unconfirmed and reported instead.
+class JournalDrainer(Thread):
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+        journal: OperationJournal,
+        on_change: Callable[[int], None] | None = None,
+        on_failed: Callable[[JournalOperation, Exception], None] | None = None,
+        batch_size: int = 50,
+        retry_base_seconds: float = 1,
+        retry_max_seconds: float = 60,
+    ):
+        super().__init__(name="journal-drainer", daemon=True)
+        self.journal = journal
+        self.on_change = on_change
+        self.on_failed = on_failed
+        self.batch_size = batch_size
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._wake = Event()
+        self._stopped = Event()
+        self._failures = 0
+        # Operations of rejected batches, to be sent on their own
+        self._isolated : set = set()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change(self.journal.depth())
+
+    def next_batch(self) -> List[JournalOperation]:
+        ops = self.journal.pending(limit=self.batch_size)
+        if len(ops) == 0:
+            return []
+        batch = [ops[0]]
+        if ops[0].id in self._isolated:
+            return batch
+        seen = set(ops[0].pks())
+        for op in ops[1:]:
+            # Repeated pks are kept in separate batches so that the order
+            # of operations on the same stock item is preserved
+            if op.batch_key() != batch[0].batch_key() or seen.intersection(op.pks()) or op.id in self._isolated:
+                break
+            batch.append(op)
+            seen.update(op.pks())
+        return batch
+
+    def submit(self, batch: List[JournalOperation]):
+        first = batch[0]
+        if first.method == DEFAULT_LOCATION_METHOD:
+            location = first.payload["location"]
+            errors = set_default_locations([op.payload["part"] for op in batch], location)
+            done = [op for op in batch if op.payload["part"] not in errors]
+            self.journal.mark_done(done)
+            failed = [op for op in batch if op.payload["part"] in errors]
+            if len(failed) > 0:
+                raise PartialBatchError(failed, next(iter(errors.values())))
+            return
+
+        kwargs = {k: v for k, v in first.payload.items() if k != "items"}
+        items = [i for op in batch for i in op.payload["items"]]
+        adjust_stock_items(first.method, items, **kwargs)
+        self.journal.mark_done(batch)
+
+    def run(self):
+        self._notify()
+        while not self._stopped.is_set():
+            batch = self.next_batch()
+            if len(batch) == 0:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            try:
+                self.submit(batch)
+                self._failures = 0
+                self._isolated.difference_update(op.id for op in batch)
+            except PartialBatchError as e:
+                self.handle_failure(e.ops, e.error)
+            except Exception as e:
+                self.handle_failure(batch, e)
+
+            self._notify()
+
+    def handle_failure(self, batch: List[JournalOperation], e: Exception):
+        if is_permanent_error(e):
+            if len(batch) > 1:
+                # A rejected request is not applied, find the offending operation
+                logging.warning("Journaled %s batch of %d rejected, sending them one by one: %s",
+                    batch[0].method, len(batch), e)
+                self._isolated.update(op.id for op in batch)
+                return
+            logging.error("Journaled %s rejected by the server: %s", batch[0].method, e)
+            self._isolated.difference_update(op.id for op in batch)
+            self.journal.mark_failed(batch, str(e))
+            self.report_failed(batch, e)
+            return
+
+        if batch[0].method in NON_IDEMPOTENT_METHODS and is_ambiguous_error(e):
+            logging.error("Journaled %s may or may not have been applied, not retrying: %s", batch[0].method, e)
+            self._isolated.difference_update(op.id for op in batch)
+            self.journal.mark_unconfirmed(batch, str(e))
+            self.report_failed(batch, UnconfirmedOperationError(e))
+            return
+
+        self._failures += 1
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (self._failures - 1))
+        logging.warning("Journaled %s failed, retrying in %.0fs: %s", batch[0].method, delay, e)
+        self.journal.mark_retry(batch, str(e))
+        self._notify()
+        self._stopped.wait(delay)
+
+    def report_failed(self, batch: List[JournalOperation], e: Exception):
+        if self.on_failed is not None:
+            for op in batch:
+                self.on_failed(op, e)
+
+
+journal : OperationJournal | None = None
+drainer : JournalDrainer | None = None
+
+def start_journal(
+    on_change: Callable[[int], None] | None = None,
+    on_failed: Callable[[JournalOperation, Exception], None] | None = None,
+) -> OperationJournal | None:
+    global journal, drainer
+    if not settings.journal.enabled:
+        return None
+    path = settings.journal.path or default_journal_path()
+    journal = OperationJournal(path)
+    journal.prune()
+    drainer = JournalDrainer(
+        journal,
+        on_change=on_change,
+        on_failed=on_failed,
+        batch_size=settings.journal.batch_size,
+        retry_base_seconds=settings.journal.retry_base_seconds,
+        retry_max_seconds=settings.journal.retry_max_seconds,
+    )
+    drainer.start()
+    return journal
+
+def stop_journal():
+    if drainer is not None:
+        drainer.stop()
+
+# Whether writes are queued in the journal rather than applied right away.
+# Queued writes have not reached the server yet; their outcome is reported
+# through the journal's on_change and on_failed callbacks.
+def writes_are_queued() -> bool:
+    return journal is not None and drainer is not None
+
+# Queues a stock adjustment, or applies it right away if the journal is not running
+def submit_stock_adjustment(method: str, items: List[Dict[str, Any]], **kwargs):
+    if method not in ADJUST_METHODS:
+        raise ValueError(f"Stock adjustment method '{method}' not supported")
+    if not writes_are_queued():
+        adjust_stock_items(method, items, **kwargs)
+        return
+    payload = dict(kwargs)
+    payload["items"] = items
+    journal.enqueue(method, payload)
+    drainer.wake()
+
+# Queues default location updates, or applies them right away if the journal
+# is not running. Returns the errors of parts that failed to update directly.
+def submit_default_locations(part_pks: List[int], location_pk: int) -> Dict[int, Exception]:
+    if not writes_are_queued():
+        return set_default_locations(part_pks, location_pk)
+    for pk in part_pks:
+        journal.enqueue(DEFAULT_LOCATION_METHOD, {"part": pk, "location": location_pk})
+    drainer.wake()
+    return {}
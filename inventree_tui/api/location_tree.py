@@ -0,0 +1,187 @@
+import logging
+from collections import deque
+from threading import Lock, RLock
+from typing import Dict, List, Set
+
+from inventree.stock import StockLocation
+
+from .base import api
+from .fuzzy_index import TrigramIndex
+from .object_store import object_store
+
+# In-memory index of the whole stock location hierarchy.
+# It is loaded with a single paginated StockLocation.list and can then answer
+# path, ancestor, descendant and name queries without touching the network.
+# On a warm start it is first built from the persistent object store and
+# marked stale until the next load() from the server.
+class LocationTree():
+    page_size = 500
+
+    def __init__(self):
+        self._locations : Dict[int, StockLocation] = {}
+        self._children : Dict[int | None, Set[int]] = {}
+        self._by_name : Dict[str, Set[int]] = {}
+        self._search_index : TrigramIndex[StockLocation] = TrigramIndex()
+        self._lock = RLock()
+        self._load_lock = Lock()
+        self.loaded = False
+        self.stale = False
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, pk):
+        return pk in self._locations
+
+    def _fetch_pages(self, **kwargs):
+        offset = 0
+        while True:
+            page = StockLocation.list(api, limit=self.page_size, offset=offset, **kwargs)
+            yield page
+            if len(page) < self.page_size:
+                return
+            offset += self.page_size
+
+    def _index(self, location: StockLocation):
+        old = self._locations.get(location.pk)
+        if old is not None:
+            self._unindex(old)
+        self._locations[location.pk] = location
+        self._children.setdefault(location.parent, set()).add(location.pk)
+        self._by_name.setdefault(location.name.lower(), set()).add(location.pk)
+        self._search_index.add(location.pk, location.name, location)
+
+    def _unindex(self, location: StockLocation):
+        self._locations.pop(location.pk, None)
+        self._children.get(location.parent, set()).discard(location.pk)
+        self._by_name.get(location.name.lower(), set()).discard(location.pk)
+        self._search_index.remove(location.pk)
+
+    # Replaces the whole index with a fresh copy from the server.
+    # The new index is built aside and swapped in, so readers never wait on it.
+    def load(self):
+        locations = [loc for page in self._fetch_pages() for loc in page]
+        self._replace(locations)
+        if object_store is not None:
+            object_store.put_many(locations)
+        logging.info("Loaded %d stock locations", len(locations))
+
+    # Builds the index from the persistent object store, if it has locations
+    def load_stored(self) -> bool:
+        if object_store is None:
+            return False
+        locations = [StockLocation(api, data=data) for data in object_store.all(StockLocation)]
+        if len(locations) == 0:
+            return False
+        self._replace(locations, stale=True)
+        logging.info("Loaded %d stored stock locations", len(locations))
+        return True
+
+    def _replace(self, locations: List[StockLocation], stale: bool = False):
+        fresh = LocationTree()
+        for location in locations:
+            # pylint: disable=protected-access
+            fresh._index(location)
+        with self._lock:
+            self._locations = fresh._locations
+            self._children = fresh._children
+            self._by_name = fresh._by_name
+            self._search_index = fresh._search_index
+            self.loaded = True
+            self.stale = stale
+
+    def ensure_loaded(self):
+        with self._load_lock:
+            if not self.loaded and not self.load_stored():
+                self.load()
+
+    # Adds a location that is not indexed yet (e.g. created since the last
+    # load), fetching any of its ancestors that are missing too, so that its
+    # full path is complete
+    def add_with_ancestors(self, location: StockLocation):
+        added = [location]
+        seen = {location.pk}
+        parent = location.parent
+        while parent is not None and parent not in self._locations and parent not in seen:
+            seen.add(parent)
+            ancestor = StockLocation(api, parent)
+            added.append(ancestor)
+            parent = ancestor.parent
+
+        with self._lock:
+            for loc in added:
+                self._index(loc)
+        if object_store is not None:
+            object_store.put_many(added)
+
+    # Applies a single changed location (e.g. one that was just scanned)
+    def update(self, location: StockLocation):
+        with self._lock:
+            self._index(location)
+        if object_store is not None:
+            object_store.put(location)
+
+    def remove(self, pk: int):
+        with self._lock:
+            location = self._locations.get(pk)
+            if location is not None:
+                self._unindex(location)
+
+    def get(self, pk: int | None) -> StockLocation | None:
+        if pk is None:
+            return None
+        return self._locations.get(pk)
+
+    def all(self) -> List[StockLocation]:
+        with self._lock:
+            return list(self._locations.values())
+
+    # Returns the ancestors of a location, root first, excluding the location itself
+    def ancestors(self, pk: int) -> List[StockLocation]:
+        path = []
+        seen = {pk}
+        with self._lock:
+            location = self._locations.get(pk)
+            parent = location.parent if location is not None else None
+            while parent is not None and parent not in seen:
+                seen.add(parent)
+                location = self._locations.get(parent)
+                if location is None:
+                    break
+                path.append(location)
+                parent = location.parent
+        path.reverse()
+        return path
+
+    def full_path(self, pk: int, separator: str = "/") -> str:
+        location = self.get(pk)
+        if location is None:
+            return ""
+        names = [loc.name for loc in self.ancestors(pk)] + [location.name]
+        return separator.join(names)
+
+    def children(self, pk: int | None) -> List[StockLocation]:
+        with self._lock:
+            return [self._locations[c] for c in self._children.get(pk, set())]
+
+    def descendants(self, pk: int) -> List[StockLocation]:
+        result = []
+        with self._lock:
+            queue = deque(self._children.get(pk, set()))
+            while queue:
+                child = queue.popleft()
+                result.append(self._locations[child])
+                queue.extend(self._children.get(child, set()))
+        return result
+
+    def find_by_name(self, name: str) -> List[StockLocation]:
+        with self._lock:
+            return [self._locations[pk] for pk in self._by_name.get(name.lower(), set())]
+
+    # Fuzzy name search for autocomplete, answered from memory
+    def search(self, text: str, limit: int = 10) -> List[StockLocation]:
+        with self._lock:
+            return self._search_index.search(text, limit=limit)
+
+
+location_tree = LocationTree()
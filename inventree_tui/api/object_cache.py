@@ -0,0 +1,218 @@
+import logging
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Dict, Iterable, List, Set, Tuple, Type, TypeVar
+
+from inventree.base import InventreeObject
+from inventree.part import Part
+from inventree.stock import StockLocation
+
+from inventree_tui.settings import settings
+from .base import api
+from .object_store import object_store, ObjectStore
+
+T = TypeVar('T', bound=InventreeObject)
+
+CacheKey = Tuple[Type[InventreeObject], int]
+
+# Process-wide identity map for InvenTree objects, keyed by (model class, pk).
+# Every wrapper in inventree_tui.api should resolve related objects through
+# the shared `object_cache` instance instead of calling getPart()/getLocation()
+# so that repeated scans of the same part or location cost a single request.
+# Misses fall through to the persistent `store` (if any), whose copies are
+# returned right away and revalidated against the server in the background.
+# Only slowly changing models use the store; stock items are not persisted,
+# and code acting on their location or quantity uses fetch().
+class ObjectCache():
+    def __init__(self,
+        ttl_seconds: float = 300,
+        max_size: int = 2048,
+        store: ObjectStore | None = None,
+        stored_classes: Tuple[Type[InventreeObject], ...] = (Part, StockLocation),
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.store = store
+        self.stored_classes = stored_classes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Classes whose list endpoint ignored the pk__in filter
+        self._bulk_unsupported : Set[Type[InventreeObject]] = set()
+        self._entries : OrderedDict[CacheKey, Tuple[float, InventreeObject]] = OrderedDict()
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(cls: Type[InventreeObject], pk: int) -> CacheKey:
+        return (cls, int(pk))
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds
+
+    # Returns the cached object, or None if it is missing or expired
+    def lookup(self, cls: Type[T], pk: int) -> T | None:
+        key = self.key(cls, pk)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    # Returns the cached object, fetching it from the server on a miss
+    def get(self, cls: Type[T], pk: int | None) -> T | None:
+        if pk is None:
+            return None
+        obj = self.lookup(cls, pk)
+        if obj is None:
+            obj = self._load(cls, pk)
+        return obj
+
+    # Always fetches the current state from the server, bypassing the cache
+    # and the store, and refreshes the cached instance
+    def fetch(self, cls: Type[T], pk: int) -> T:
+        return self.put(cls(api, pk))
+
+    def _store_for(self, cls: Type[InventreeObject]) -> ObjectStore | None:
+        return self.store if cls in self.stored_classes else None
+
+    def _load(self, cls: Type[T], pk: int) -> T:
+        store = self._store_for(cls)
+        if store is None:
+            return self.put(cls(api, pk))
+
+        data = store.get(cls, pk)
+        if data is not None:
+            obj = self.put(cls(api, data=data), persist=False)
+            store.revalidate(cls, pk, self._revalidated)
+            return obj
+        return self.put(store.fetch(cls, pk), persist=False)
+
+    def _revalidated(self, objs: List[T]):
+        # The store has already saved the fresh copies
+        for obj in objs:
+            self.put(obj, persist=False)
+
+    # Resolves many objects at once, returned as a dict keyed by pk.
+    # Stored copies are used first and revalidated in the background. The
+    # rest is fetched with one pk-filtered list call per chunk; anything the
+    # list call did not return is fetched individually. If the server ignores
+    # the filter, the class is fetched individually from then on.
+    def get_many(self, cls: Type[T], pks: Iterable[int | None], chunk_size: int = 100) -> Dict[int, T]:
+        found : Dict[int, T] = {}
+        missing : List[int] = []
+        for pk in dict.fromkeys(int(pk) for pk in pks if pk is not None):
+            obj = self.lookup(cls, pk)
+            if obj is None:
+                missing.append(pk)
+            else:
+                found[pk] = obj
+
+        store = self._store_for(cls)
+        if store is not None and len(missing) > 0:
+            stored = store.get_many(cls, missing)
+            for pk, data in stored.items():
+                found[pk] = self.put(cls(api, data=data), persist=False)
+            missing = [pk for pk in missing if pk not in stored]
+            store.revalidate_many(cls, list(stored.keys()), self._revalidated, chunk_size=chunk_size)
+
+        for i in range(0, len(missing), chunk_size):
+            if cls in self._bulk_unsupported:
+                break
+            chunk = missing[i:i+chunk_size]
+            fetched = cls.list(api, pk__in=",".join(str(pk) for pk in chunk), limit=len(chunk))
+            requested = set(chunk)
+            matching = [obj for obj in fetched if obj.pk in requested]
+            if len(matching) < len(fetched):
+                logging.warning("Server ignored the pk__in filter for %s, fetching them one by one", cls.__name__)
+                self._bulk_unsupported.add(cls)
+            for obj in self.put_many(matching):
+                found[obj.pk] = obj
+
+        for pk in missing:
+            if pk not in found:
+                logging.debug("Bulk fetch did not return %s #%s", cls.__name__, pk)
+                found[pk] = self._load(cls, pk)
+
+        return found
+
+    # Stores an object and returns the canonical instance for its key.
+    # If an instance is already cached, its data is refreshed in place so
+    # that everybody holding a reference sees the new values.
+    def put(self, obj: T, persist: bool = True) -> T:
+        store = self._store_for(obj.__class__)
+        if persist and store is not None:
+            store.put(obj)
+        key = self.key(obj.__class__, obj.pk)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not obj:
+                # pylint: disable=protected-access
+                entry[1]._data = obj._data
+                obj = entry[1]
+            self._entries[key] = (time.monotonic(), obj)
+            self._entries.move_to_end(key)
+            self._evict()
+        return obj
+
+    def put_many(self, objs: Iterable[T], persist: bool = True) -> List[T]:
+        objs = list(objs)
+        stored = [obj for obj in objs if self._store_for(obj.__class__) is not None]
+        if persist and len(stored) > 0:
+            self.store.put_many(stored)
+        return [self.put(obj, persist=False) for obj in objs]
+
+    def _evict(self):
+        while self.max_size > 0 and len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, cls: Type[InventreeObject], pk: int | None):
+        if pk is None:
+            return
+        with self._lock:
+            self._entries.pop(self.key(cls, pk), None)
+        if self.store is not None:
+            self.store.invalidate(cls, pk)
+
+    def invalidate_many(self, cls: Type[InventreeObject], pks: Iterable[int | None]):
+        for pk in pks:
+            self.invalidate(cls, pk)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int | float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total > 0 else 0.0,
+            }
+
+    def log_stats(self):
+        logging.info("Object cache stats: %s", self.stats())
+        if self.store is not None:
+            logging.info("Object store stats: %s", self.store.stats())
+
+
+object_cache = ObjectCache(
+    ttl_seconds=settings.object_cache.ttl_seconds,
+    max_size=settings.object_cache.max_size,
+    store=object_store,
+)
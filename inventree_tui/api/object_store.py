@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Type, TypeVar
+
+from inventree.base import InventreeObject
+from requests.exceptions import HTTPError
+
+from inventree_tui.settings import settings
+from .base import api
+
+T = TypeVar('T', bound=InventreeObject)
+
+def default_store_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".cache", "inventree-tui", "objects.sqlite3")
+
+def object_url(cls: Type[InventreeObject], pk: int) -> str:
+    return f"{cls.URL.rstrip('/')}/{pk}/"
+
+def not_modified(e: HTTPError) -> bool:
+    detail = e.args[0] if len(e.args) > 0 else None
+    return isinstance(detail, dict) and detail.get("status_code") == 304
+
+# Persistent on-disk store of the objects the TUI has seen.
+# Objects are served from here immediately after a restart and revalidated
+# in the background (stale-while-revalidate), with conditional requests when
+# the server sent an ETag or Last-Modified header. The store is capped with
+# LRU eviction.
+class ObjectStore():
+    def __init__(self, path: str, max_entries: int = 20000, revalidate_workers: int = 2):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.not_modified = 0
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS objects (
+                model TEXT NOT NULL,
+                pk INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (model, pk)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS objects_accessed ON objects (accessed)")
+        self._executor = ThreadPoolExecutor(max_workers=revalidate_workers, thread_name_prefix="revalidate")
+        self._revalidating : set = set()
+
+    @staticmethod
+    def model(cls: Type[InventreeObject]) -> str:
+        return cls.__name__
+
+    def get(self, cls: Type[T], pk: int) -> Dict[str, Any] | None:
+        return self.get_many(cls, [pk]).get(int(pk))
+
+    def get_many(self, cls: Type[T], pks: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        pks = [int(pk) for pk in pks]
+        if len(pks) == 0:
+            return {}
+        model = self.model(cls)
+        marks = ",".join("?" * len(pks))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT pk, data FROM objects WHERE model = ? AND pk IN ({marks})",
+                [model] + pks
+            ).fetchall()
+            self._conn.execute(
+                f"UPDATE objects SET accessed = ? WHERE model = ? AND pk IN ({marks})",
+                [time.time(), model] + pks
+            )
+            self.hits += len(rows)
+            self.misses += len(pks) - len(rows)
+        return {pk: json.loads(data) for pk, data in rows}
+
+    def all(self, cls: Type[T]) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM objects WHERE model = ?", (self.model(cls),)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def put(self, obj: InventreeObject):
+        self.put_many([obj])
+
+    def put_many(self, objs: Iterable[InventreeObject], validators: Dict[int, Tuple[str | None, str | None]] | None = None):
+        now = time.time()
+        validators = validators or {}
+        rows = []
+        for obj in objs:
+            etag, last_modified = validators.get(obj.pk, (None, None))
+            # pylint: disable=protected-access
+            rows.append((self.model(obj.__class__), obj.pk, json.dumps(obj._data), etag, last_modified, now, now))
+        if len(rows) == 0:
+            return
+        with self._lock:
+            # Copies without validators (e.g. from a list) keep the known
+            # validators as long as the data did not change
+            self._conn.executemany("""
+                INSERT INTO objects (model, pk, data, etag, last_modified, fetched, accessed) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (model, pk) DO UPDATE SET
+                    etag = CASE WHEN excluded.etag IS NULL AND excluded.last_modified IS NULL AND objects.data = excluded.data
+                        THEN objects.etag ELSE excluded.etag END,
+                    last_modified = CASE WHEN excluded.etag IS NULL AND excluded.last_modified IS NULL AND objects.data = excluded.data
+                        THEN objects.last_modified ELSE excluded.last_modified END,
+                    data = excluded.data,
+                    fetched = excluded.fetched,
+                    accessed = excluded.accessed
+            """, rows)
+            self._evict()
+
+    def _evict(self):
+        if self.max_entries <= 0:
+            return
+        count = self._conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM objects WHERE rowid IN (SELECT rowid FROM objects ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def invalidate(self, cls: Type[InventreeObject], pk: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM objects WHERE model = ? AND pk = ?", (self.model(cls), int(pk)))
+
+    # Returns the (ETag, Last-Modified) validators the server sent with the stored copy
+    def validators(self, cls: Type[InventreeObject], pk: int) -> Tuple[str | None, str | None]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM objects WHERE model = ? AND pk = ?", (self.model(cls), int(pk))
+            ).fetchone()
+        return (row[0], row[1]) if row is not None else (None, None)
+
+    # Fetches an object from the server, sending a conditional request if
+    # validators are known. Returns None if the stored copy is still current.
+    def fetch(self, cls: Type[T], pk: int, etag: str | None = None, last_modified: str | None = None) -> T | None:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            response = api.request(object_url(cls, pk), method="get", headers=headers)
+        except HTTPError as e:
+            if len(headers) > 0 and not_modified(e):
+                self.not_modified += 1
+                self.touch(cls, [pk])
+                return None
+            raise
+
+        obj = cls(api, data=response.json())
+        self.put_many([obj], validators={obj.pk: (response.headers.get("ETag"), response.headers.get("Last-Modified"))})
+        return obj
+
+    def touch(self, cls: Type[InventreeObject], pks: List[int]):
+        marks = ",".join("?" * len(pks))
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE objects SET fetched = ? WHERE model = ? AND pk IN ({marks})",
+                [time.time(), self.model(cls)] + [int(pk) for pk in pks]
+            )
+
+    # Runs task in the background for the keys not already being revalidated
+    def _submit_once(self, keys: List[Tuple[str, int]], task: Callable[[List[int]], Any]):
+        with self._lock:
+            keys = [key for key in keys if key not in self._revalidating]
+            if len(keys) == 0:
+                return
+            self._revalidating.update(keys)
+
+        def run():
+            try:
+                task([pk for _, pk in keys])
+            finally:
+                with self._lock:
+                    self._revalidating.difference_update(keys)
+
+        self._executor.submit(run)
+
+    # Re-fetches an object in the background with a conditional request and
+    # hands fresh copies to on_update
+    def revalidate(self, cls: Type[T], pk: int, on_update: Callable[[List[T]], Any]):
+        def task(_pks: List[int]):
+            try:
+                etag, last_modified = self.validators(cls, pk)
+                obj = self.fetch(cls, pk, etag=etag, last_modified=last_modified)
+                self.revalidated += 1
+                if obj is not None:
+                    on_update([obj])
+            except Exception as e:
+                logging.info("Revalidating %s #%s failed: %s", cls.__name__, pk, e)
+
+        self._submit_once([(self.model(cls), int(pk))], task)
+
+    # Re-fetches many objects in the background with pk-filtered list calls.
+    # List responses carry no validators, so the stored copies are replaced.
+    def revalidate_many(self, cls: Type[T], pks: List[int], on_update: Callable[[List[T]], Any], chunk_size: int = 100):
+        if len(pks) == 0:
+            return
+
+        def task(pks: List[int]):
+            try:
+                for i in range(0, len(pks), chunk_size):
+                    chunk = pks[i:i+chunk_size]
+                    fetched = cls.list(api, pk__in=",".join(str(pk) for pk in chunk), limit=len(chunk))
+                    # Servers ignoring pk__in return unrelated objects
+                    requested = set(chunk)
+                    fetched = [obj for obj in fetched if obj.pk in requested]
+                    self.put_many(fetched)
+                    self.revalidated += len(fetched)
+                    on_update(fetched)
+            except Exception as e:
+                logging.info("Revalidating %d %s objects failed: %s", len(pks), cls.__name__, e)
+
+        self._submit_once([(self.model(cls), int(pk)) for pk in pks], task)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "not_modified": self.not_modified,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._conn.close()
+
+# Fetches every object of the given classes into the store, page by page
+def warm_cache(store: ObjectStore, classes: List[Type[InventreeObject]], page_size: int = 500) -> List[Tuple[str, int]]:
+    counts = []
+    for cls in classes:
+        total = 0
+        offset = 0
+        while True:
+            page = cls.list(api, limit=page_size, offset=offset)
+            store.put_many(page)
+            total += len(page)
+            if len(page) < page_size:
+                break
+            offset += page_size
+        counts.append((cls.__name__, total))
+    return counts
+
+
+object_store : ObjectStore | None = None
+if settings.object_store.enabled:
+    object_store = ObjectStore(
+        settings.object_store.path or default_store_path(),
+        max_entries=settings.object_store.max_entries,
+    )
@@ -0,0 +1,36 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from inventree.part import Part
+from inventree.stock import StockItem
+
+from inventree_tui.settings import settings
+from .base import api
+from .object_cache import object_cache
+
+# Write operations against the server.
+# These are applied either directly or by the operation journal's drainer.
+
+def adjust_stock_items(method: str, items: List[Dict[str, Any]], **kwargs):
+    StockItem.adjustStockItems(api, method, items, **kwargs)
+    object_cache.invalidate_many(StockItem, [i["pk"] for i in items])
+
+# Sets the default location of each part, PATCHing several parts concurrently.
+# Returns the errors of the parts that could not be updated, keyed by part pk.
+def set_default_locations(part_pks: List[int], location_pk: int) -> Dict[int, Exception]:
+    def save(pk):
+        # Only the pk is needed to PATCH, avoid fetching the part first
+        Part(api, data={"pk": pk}).save(data={"default_location": location_pk})
+        object_cache.invalidate(Part, pk)
+
+    errors = {}
+    max_workers = max(1, min(settings.api_client.max_parallel_writes, len(part_pks)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {pk: executor.submit(save, pk) for pk in part_pks}
+        for pk, future in futures.items():
+            e = future.exception()
+            if e is not None:
+                logging.error("Failed to set default location of part #%s: %s", pk, e)
+                errors[pk] = e
+    return errors
@@ -4,6 +4,7 @@ from inventree.part import Part
 from inventree.stock import StockItem
 
 from .base import api
+from .object_cache import object_cache
 from .stock_item import CachedStockItem
 
 
@@ -17,8 +18,9 @@ class CachedPart(): # pylint: disable=too-few-public-methods
         if self._stock_items is None:
             stock_items = StockItem.list(api, part=self.part.pk)
             self._stock_items = [CachedStockItem(stock_item=item) for item in stock_items]
+            CachedStockItem.prefetch_many(self._stock_items)
         return self._stock_items
 
 def part_search(search_term="") -> List[CachedPart]:
     parts = Part.list(api, search=search_term)
-    return [CachedPart(p) for p in parts]
+    return [CachedPart(p) for p in object_cache.put_many(parts)]
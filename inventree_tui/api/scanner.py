@@ -1,9 +1,14 @@
+import asyncio
+import heapq
 import logging
 import json
-from typing import List, Type, Dict
+import time
+from collections import deque
+from typing import List, Type, Dict, Tuple
 
 from dataclasses import dataclass
 from inventree.base import InventreeObject
+from inventree.stock import StockItem
 from requests.exceptions import RequestException
 from fuzzywuzzy import fuzz
 
@@ -24,7 +29,13 @@ from textual_autocomplete import (
 
 from inventree_tui.sound import Sound
 from inventree_tui.error_screen import IgnorableErrorEvent
-from .base import api, ApiException
+from inventree_tui.status import StatusChanged
+from inventree_tui.settings import settings
+from .base import api, ApiException, NETWORK_ERRORS
+from .async_client import async_api
+from .location_tree import LocationTree
+from .object_cache import object_cache
+from .search_cache import SearchCache
 
 
 class WhitelistException(Exception):
@@ -52,11 +63,69 @@ def item_class(item, whitelist: List[Type[InventreeObject]]) -> Type[InventreeOb
             return cls
     return None
 
+# Model types that InvenTree encodes in its own JSON barcodes
+INVENTREE_BARCODE_MODELS = {
+    "part",
+    "partcategory",
+    "stockitem",
+    "stocklocation",
+    "supplierpart",
+    "manufacturerpart",
+    "build",
+    "purchaseorder",
+    "salesorder",
+    "returnorder",
+}
+
+# Fields of a scan response that only reference the object
+SCAN_REFERENCE_FIELDS = {"pk", "api_url", "web_url"}
+
+# Decodes InvenTree's own JSON barcodes (e.g. {"stockitem": 123}) locally.
+# Returns (model type, pk), or None for custom and external barcodes,
+# which have to be resolved by the server.
+def decode_barcode(text: str) -> Tuple[str, int] | None:
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or len(data) != 1:
+        return None
+
+    ((model_type, pk),) = data.items()
+    if model_type not in INVENTREE_BARCODE_MODELS:
+        return None
+    if isinstance(pk, str) and pk.strip().isdigit():
+        pk = int(pk)
+    if not isinstance(pk, int) or isinstance(pk, bool) or pk <= 0:
+        return None
+    return (model_type, pk)
+
+# The location and quantity of a scanned stock item are acted on right away,
+# so it is always fetched from the server instead of the cache
+FETCH_ON_SCAN = (StockItem,)
+
+def resolve_scanned(cls: Type[InventreeObject], pk: int):
+    if cls in FETCH_ON_SCAN:
+        return object_cache.fetch(cls, pk)
+    return object_cache.get(cls, pk)
+
 def scan_to_object(item, cls: Type[InventreeObject]):
-    return cls(api, item[cls.MODEL_TYPE]["pk"])
+    data = item[cls.MODEL_TYPE]
+    if set(data.keys()) - SCAN_REFERENCE_FIELDS:
+        # The server sent the serialized object along, no need to fetch it again
+        return object_cache.put(cls(api, data=data))
+    return resolve_scanned(cls, data["pk"])
 
 def scan_barcode(text, whitelist: List[Type[InventreeObject]]) -> Type[InventreeObject]:
     try:
+        decoded = decode_barcode(text)
+        if decoded is not None:
+            (model_type, pk) = decoded
+            for cls in whitelist:
+                if cls.MODEL_TYPE == model_type:
+                    return resolve_scanned(cls, pk)
+            raise WhitelistException({model_type: pk}, whitelist)
+
         item = api.scanBarcode(text)
         cls = item_class(item, whitelist)
         if cls is None:
@@ -66,6 +135,9 @@ def scan_barcode(text, whitelist: List[Type[InventreeObject]]) -> Type[Inventree
     except RequestException as e:
         if e.response is not None:
             raise ApiException(f"{e.response.text}", status_code=e.response.status_code) from e
+        if len(e.args) == 0 or not isinstance(e.args[0], dict):
+            # No HTTP response at all (server unreachable, timeout, ...)
+            raise
 
         status = e.args[0]['status_code']
         if status != 200:
@@ -94,12 +166,17 @@ def search_similarity(search_term: str, string: str):
 
 class InventreeScanner(Vertical):
     search_limit = 5
+    local_search_limit = 10
+    dropdown_limit = 10
 
+    # 'origin' is the time.monotonic() at which the scan was submitted, so
+    # the sounds it causes can be timed from the scan
     class ItemScanned(Event):
-        def __init__(self, sender, obj: InventreeObject):
+        def __init__(self, sender, obj: InventreeObject, origin: float | None = None):
             super().__init__()
             self.sender = sender
             self.obj = obj
+            self.origin = origin
 
     # pylint: disable=redefined-builtin,too-many-arguments
     def __init__(self,
@@ -109,7 +186,8 @@ class InventreeScanner(Vertical):
         input_id: str | None = None,
         autocomplete: bool = False,
         search: bool = False,
-        sound: bool = False
+        sound: bool = False,
+        local_index: LocationTree | None = None,
     ) -> None:
         self.input_id = input_id
         self.whitelist = whitelist if whitelist is not None else []
@@ -117,51 +195,148 @@ class InventreeScanner(Vertical):
         self.autocomplete_enabled = autocomplete
         self.search_enabled = search
         self.sound = sound
-        self.search_cache : Dict[Type[InventreeObject], Dict[str, List[InventreeObject]]] = {}
+        # When set, autocomplete is answered from this in-memory index
+        # instead of searching the server on every keystroke
+        self.local_index = local_index
+        self.search_cache = SearchCache(max_terms=settings.scanner.search_cache_terms)
+        self.search_debounce = settings.scanner.search_debounce_ms / 1000
+        self._latest_search : str | None = None
+        # Keystroke-to-dropdown latencies (seconds) of recent searches
+        self.search_latencies : deque[float] = deque(maxlen=100)
+        # Set when the local index could not be loaded from the server
+        self.local_index_failed = False
         self.dropdown = Dropdown(
             items=self.get_dropdown_items
         )
 
         super().__init__(id=id)
 
-    @work(exclusive=False, thread=True)
-    def search(self, search_term: str) -> None:
+    def on_mount(self) -> None:
+        if self.local_index is not None:
+            self.load_local_index()
+            interval = settings.scanner.local_index_refresh_seconds
+            if interval > 0:
+                self.set_interval(interval, self.reload_local_index)
+
+    @work(exclusive=False, thread=True, group="local_index")
+    def load_local_index(self) -> None:
+        try:
+            self.local_index.ensure_loaded()
+            # A stored copy is usable right away but still has to be revalidated
+            if self.local_index.stale:
+                self.local_index.load()
+        except NETWORK_ERRORS as e:
+            self.on_local_index_error(e)
+            return
+        self.local_index_failed = False
+
+    @work(exclusive=True, thread=True, group="local_index")
+    def reload_local_index(self) -> None:
+        try:
+            self.local_index.load()
+        except NETWORK_ERRORS as e:
+            self.on_local_index_error(e)
+            return
+        self.local_index_failed = False
+
+    # Called when the server is reachable again
+    def retry_local_index(self) -> None:
+        if self.local_index is not None and self.local_index_failed:
+            self.reload_local_index()
+
+    # The stored (or empty) index stays in use. Loading is tried again on
+    # the next refresh interval, or once the server is reachable again.
+    def on_local_index_error(self, e: Exception) -> None:
+        self.local_index_failed = True
+        logging.warning("Could not load the local index of %s: %s", self.id, e)
+        if self.local_index.loaded:
+            message = "Could not reach the server, stock locations may be out of date"
+        else:
+            message = "Could not reach the server, stock locations are searched online"
+        self.post_message(StatusChanged(self, message))
+
+    def local_index_ready(self) -> bool:
+        return self.local_index is not None and self.local_index.loaded
+
+    # Each new search cancels the previous one. Waiting out the debounce
+    # window first means that fast typing only sends the last query.
+    @work(exclusive=True, group="autocomplete")
+    async def search(self, search_term: str, keystroke_time: float) -> None:
+        await asyncio.sleep(self.search_debounce)
+
+        results = {}
         for cls in self.whitelist:
-            cls_items = cls.list(api, search=search_term, limit=self.search_limit)
-            self.search_cache.setdefault(cls, {})[search_term] = cls_items
+            try:
+                results[cls] = await async_api.list(cls, search=search_term, limit=self.search_limit)
+            except ApiException as e:
+                logging.warning("Search for '%s' failed: %s", search_term, e)
+                return
+
+        # Drop responses to queries the user has already typed past
+        if search_term != self._latest_search:
+            return
+
+        for cls, cls_items in results.items():
+            self.search_cache.add(cls, search_term, cls_items)
 
         self.dropdown.sync_state(
             self.dropdown.input_widget.value,
             self.dropdown.input_widget.cursor_position
         )
 
+        latency = time.perf_counter() - keystroke_time
+        self.search_latencies.append(latency)
+        logging.info("Autocomplete '%s' latency: %.1f ms", search_term, latency * 1000)
+
+    def search_latency_stats(self) -> Dict[str, float]:
+        samples = sorted(self.search_latencies)
+        if len(samples) == 0:
+            return {}
+        return {
+            "count": len(samples),
+            "mean_ms": 1000 * sum(samples) / len(samples),
+            "p50_ms": 1000 * samples[len(samples) // 2],
+            "p95_ms": 1000 * samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+            "max_ms": 1000 * samples[-1],
+        }
+
+    # Summary for tuning the search debounce window, logged on exit
+    def on_unmount(self) -> None:
+        stats = self.search_latency_stats()
+        if len(stats) > 0:
+            logging.info("Autocomplete latency stats (%s): %s", self.input_id, stats)
+
     def on_input_changed(self, message: Input.Changed) -> None:
         if not self.autocomplete_enabled:
             return
         text = message.value.strip()
         # Kind of a hack: If the input starts with {, don't search
         if text.startswith("{") or len(text) <= 1:
+            self._latest_search = None
+            self.workers.cancel_group(self, "autocomplete")
+            return
+        if self.local_index_ready():
+            # The dropdown queries the local index itself, no search needed
             return
-        self.search(text)
+        self._latest_search = text
+        self.search(text, time.perf_counter())
 
     def get_dropdown_items(self, input_state: InputState) -> list[DropdownItem]:
         if not self.autocomplete_enabled:
             return []
         text = input_state.value
         text = text.strip()
-        items = {}
-        for cls, d in self.search_cache.items():
-            for cls_items in d.values():
-                for item in cls_items:
-                    items[(cls, item.pk)] = item
+        if self.local_index_ready():
+            matches = self.local_index.search(text, limit=self.local_search_limit)
+            return [InventreeDropdownItem.create(i) for i in matches]
 
         minimum_similarity = 0.5
 
-        l = [(search_similarity(text, i.name), i) for i in items.values()]
+        l = [(search_similarity(text, i.name), i) for i in self.search_cache.candidates()]
         l = [(s,i) for s,i in l if s > minimum_similarity]
-        sorted_by_similarity = sorted(l, key=lambda tup: tup[0], reverse=True)
+        best = heapq.nlargest(self.dropdown_limit, l, key=lambda tup: tup[0])
 
-        return [InventreeDropdownItem.create(i) for s,i in  sorted_by_similarity]
+        return [InventreeDropdownItem.create(i) for s,i in best]
 
     def compose(self) -> ComposeResult:
         yield AutoComplete(
@@ -170,48 +345,55 @@ class InventreeScanner(Vertical):
         )
 
     @work(exclusive=False, thread=True)
-    def scan_barcode(self, text: str) -> None:
+    def scan_barcode(self, text: str, origin: float | None = None) -> None:
         try:
             obj = scan_barcode(text, self.whitelist)
         except ApiException as e:
-            event = IgnorableErrorEvent(self, "Scan Error", str(e))
+            event = IgnorableErrorEvent(self, "Scan Error", str(e), origin=origin)
             self.post_message(event)
             return
         except WhitelistException as e:
-            self.post_message(IgnorableErrorEvent(self, "Scan Error", str(e)))
+            self.post_message(IgnorableErrorEvent(self, "Scan Error", str(e), origin=origin))
+            return
+        except NETWORK_ERRORS as e:
+            message = f"Could not reach the server to look up the scanned item: {e}"
+            self.post_message(IgnorableErrorEvent(self, "Scan Error", message, origin=origin))
             return
 
-        self.post_message(self.ItemScanned(self, obj))
+        self.post_message(self.ItemScanned(self, obj, origin=origin))
 
         if self.sound:
-            self.post_message(Sound(self, name="success"))
+            self.post_message(Sound(self, name="success", origin=origin))
 
-    @work(exclusive=False, thread=True)
-    async def search_single_item(self, text: str) -> None:
+    @work(exclusive=False)
+    async def search_single_item(self, text: str, origin: float | None = None) -> None:
         # Return the first item that matches in the search.
         # Could maybe use the search cache instead of doing a new search,
         # but the cache may not be updated when the user submits their input
         for cls in self.whitelist:
             try:
-                cls_items = cls.list(api, search=text, limit=1)
-            except RequestException as e:
-                self.post_message(IgnorableErrorEvent(self, "Search Failed", str(e)))
+                cls_items = await async_api.list(cls, search=text, limit=1)
+            except ApiException as e:
+                self.post_message(IgnorableErrorEvent(self, "Search Failed", str(e), origin=origin))
+                return
 
             if len(cls_items) > 0:
-                self.post_message(self.ItemScanned(self, cls_items[0]))
+                self.post_message(self.ItemScanned(self, cls_items[0], origin=origin))
                 return
 
         event = IgnorableErrorEvent(self,
             "No Results",
-            f"The search term '{text}' yielded no results"
+            f"The search term '{text}' yielded no results",
+            origin=origin,
         )
         self.post_message(event)
 
     def on_input_submitted(self, message: Input.Submitted) -> None:
+        origin = time.monotonic()
         text = message.value.strip()
         if text.startswith("{"):
-            self.scan_barcode(text)
+            self.scan_barcode(text, origin)
         elif len(text) > 0 and (self.search_enabled or self.autocomplete_enabled):
-            self.search_single_item(text)
+            self.search_single_item(text, origin)
 
         message.input.clear()
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Tuple, Type
+
+from inventree.base import InventreeObject
+
+CandidateKey = Tuple[Type[InventreeObject], int]
+
+# Bounded cache of autocomplete search results.
+# Results are kept per search term in LRU order, and a deduplicated set of
+# candidate objects is maintained incrementally as terms are added and
+# evicted, so reading the candidates never rescans the whole history.
+class SearchCache():
+    def __init__(self, max_terms: int = 50):
+        self.max_terms = max_terms
+        self._terms : OrderedDict[Tuple[Type[InventreeObject], str], List[CandidateKey]] = OrderedDict()
+        self._candidates : Dict[CandidateKey, InventreeObject] = {}
+        self._refcounts : Dict[CandidateKey, int] = {}
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._candidates)
+
+    def __contains__(self, term_key):
+        return term_key in self._terms
+
+    def add(self, cls: Type[InventreeObject], search_term: str, items: List[InventreeObject]):
+        with self._lock:
+            term_key = (cls, search_term)
+            if term_key in self._terms:
+                self._release(self._terms.pop(term_key))
+
+            keys = []
+            for item in items:
+                key = (cls, item.pk)
+                keys.append(key)
+                # Newer results replace older copies of the same object
+                self._candidates[key] = item
+                self._refcounts[key] = self._refcounts.get(key, 0) + 1
+            self._terms[term_key] = keys
+
+            while self.max_terms > 0 and len(self._terms) > self.max_terms:
+                _, evicted = self._terms.popitem(last=False)
+                self._release(evicted)
+
+    def _release(self, keys: List[CandidateKey]):
+        for key in keys:
+            count = self._refcounts[key] - 1
+            if count > 0:
+                self._refcounts[key] = count
+            else:
+                del self._refcounts[key]
+                del self._candidates[key]
+
+    def candidates(self) -> List[InventreeObject]:
+        with self._lock:
+            return list(self._candidates.values())
+
+    def clear(self):
+        with self._lock:
+            self._terms.clear()
+            self._candidates.clear()
+            self._refcounts.clear()
@@ -0,0 +1,114 @@
+import asyncio
+import copy
+import json
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+def request_key(*args, **kwargs) -> str:
+    return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+class _Call():
+    def __init__(self):
+        self.done = Event()
+        self.result : Any = None
+        self.error : BaseException | None = None
+        self.followers = 0
+
+class _AsyncCall():
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.shared = False
+
+# Shares one in-flight call between threads asking for the same key.
+# The first caller runs the function, everybody else waits for its result.
+# Callers may mutate what they get back, so when a result was shared every
+# caller (the first one included) gets its own copy.
+class SingleFlight():
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight : Dict[Hashable, _Call] = {}
+        self._lock = Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._in_flight[key] = call
+                self.calls += 1
+            else:
+                call.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                # Nobody can join once the call is removed
+                shared = call.followers > 0
+            call.done.set()
+        return copy.deepcopy(call.result) if shared else call.result
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+# asyncio flavour of SingleFlight.
+# Calls are only shared between coroutines running on the same event loop.
+# The call runs as its own task, so cancelling one caller (e.g. a superseded
+# search) does not cancel the others; the task is only cancelled once every
+# caller waiting on it was.
+class AsyncSingleFlight():
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight : Dict[Hashable, _AsyncCall] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)
+        call = self._in_flight.get(key)
+        if call is None or call.task.done():
+            self.calls += 1
+            call = _AsyncCall(loop.create_task(fn()))
+            self._in_flight[key] = call
+            call.task.add_done_callback(lambda task: self._finished(key, call))
+        else:
+            self.coalesced += 1
+            call.shared = True
+
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller was cancelled, nobody needs the result
+                self._forget(key, call)
+                call.task.cancel()
+        return copy.deepcopy(result) if call.shared else result
+
+    def _forget(self, key: Hashable, call: _AsyncCall):
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+
+    def _finished(self, key: Hashable, call: _AsyncCall):
+        self._forget(key, call)
+        if not call.task.cancelled():
+            # Nobody may be waiting on the task, don't log it as unretrieved
+            call.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced}
@@ -1,9 +1,13 @@
+from __future__ import annotations
+
+from typing import Iterable
+
 from pydantic import BaseModel, PrivateAttr, ConfigDict
 
 from inventree.part import Part
 from inventree.stock import StockItem, StockLocation
 
-from .base import api
+from .object_cache import object_cache
 
 class CachedStockItem(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -11,6 +15,7 @@ class CachedStockItem(BaseModel):
     stock_item : StockItem
     _part : Part | None = PrivateAttr(default=None)
     _default_location : StockLocation | None = PrivateAttr(default=None)
+    _default_location_loaded : bool = PrivateAttr(default=False)
     _quantity : int | float | None = PrivateAttr(default=None)
     _stock_location : StockLocation | None = PrivateAttr(default=None)
 
@@ -24,15 +29,33 @@ class CachedStockItem(BaseModel):
     @property
     def part(self) -> Part:
         if self._part is None:
-            self._part = self.stock_item.getPart()
+            self._part = object_cache.get(Part, self.stock_item.part)
         return self._part
 
     @property
-    def default_location(self) -> StockLocation:
-        default_location_pk = self.part.default_location
-        if default_location_pk is None:
-            return None
-        return StockLocation(api, default_location_pk)
+    def default_location(self) -> StockLocation | None:
+        if not self._default_location_loaded:
+            self._default_location = object_cache.get(StockLocation, self.part.default_location)
+            self._default_location_loaded = True
+        return self._default_location
+
+    # Resolves the parts and locations of many stock items with a few bulk
+    # requests, instead of one request per item when they are first read
+    @classmethod
+    def prefetch_many(cls, items: Iterable[CachedStockItem]):
+        items = list(items)
+        parts = object_cache.get_many(Part, [i.stock_item.part for i in items])
+        locations = object_cache.get_many(StockLocation, [i.stock_item.location for i in items])
+        for item in items:
+            if item._part is None:
+                item._part = parts.get(item.stock_item.part)
+            if item._stock_location is None and item.stock_item.location is not None:
+                item._stock_location = locations.get(item.stock_item.location)
+
+    # Resolves the related objects up front, so that reading them later
+    # (e.g. from the UI thread) does not block on the network
+    def prefetch(self):
+        _ = self.part, self.stock_location, self.default_location
 
     @property
     def pk(self) -> int:
@@ -41,7 +64,7 @@ class CachedStockItem(BaseModel):
     @property
     def stock_location(self) -> StockLocation:
         if self._stock_location is None:
-            self._stock_location = self.stock_item.getLocation()
+            self._stock_location = object_cache.get(StockLocation, self.stock_item.location)
         return self._stock_location
 
     # Alias for stock_location
@@ -3,8 +3,9 @@ from textwrap import dedent
 from inventree.stock import StockItemTracking, StockItem
 from inventree.part import Part
 
-from inventree_tui.api.base import f2i, CachedInventreeObject, api
+from inventree_tui.api.base import f2i, CachedInventreeObject
 from inventree_tui.api.stock_item import CachedStockItem
+from inventree_tui.api.object_cache import object_cache
 from pydantic import PrivateAttr
 
 class CachedStockItemTracking(CachedInventreeObject[StockItemTracking]):
@@ -14,7 +15,7 @@ class CachedStockItemTracking(CachedInventreeObject[StockItemTracking]):
     @property
     def stock_item(self):
         if self._stock_item is None:
-            self._stock_item = CachedStockItem(stock_item=StockItem(api,self.obj.item))
+            self._stock_item = CachedStockItem(stock_item=object_cache.get(StockItem, self.obj.item))
         return self._stock_item
 
     @classmethod
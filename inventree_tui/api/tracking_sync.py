@@ -0,0 +1,165 @@
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from typing import Iterator, List, Tuple
+
+from inventree.stock import StockItemTracking
+
+from .base import api
+from .stock_item_tracking import CachedStockItemTracking
+
+# Incremental sync of stock tracking history.
+# Keeps a high-water mark (the newest pk seen so far) and only requests
+# entries above it, in pk order, using the last pk of each page as the
+# cursor for the next one. Unlike limit/offset paging, this does not shift
+# when new entries are inserted while paging.
+class TrackingSync():
+    def __init__(self, page_size: int = 50):
+        self.page_size = page_size
+        self.high_water_mark : int | None = None
+        # Whether the server honours the pk__gt filter and pk ordering, None until known
+        self.cursor_supported : bool | None = None
+
+    def advance(self, items: List[CachedStockItemTracking]):
+        for item in items:
+            if self.high_water_mark is None or item.obj.pk > self.high_water_mark:
+                self.high_water_mark = item.obj.pk
+
+    def reset(self):
+        self.high_water_mark = None
+
+    # Returns the entries newer than the high-water mark, oldest first
+    def fetch_new(self) -> List[CachedStockItemTracking]:
+        if self.high_water_mark is None:
+            return []
+        if self.cursor_supported is not False:
+            new_items = self._fetch_by_cursor()
+            if new_items is not None:
+                return new_items
+        return self._fetch_newest_first()
+
+    def _fetch_by_cursor(self) -> List[CachedStockItemTracking] | None:
+        new_items : List[CachedStockItemTracking] = []
+        cursor = self.high_water_mark
+        while True:
+            page = CachedStockItemTracking.list(api, pk__gt=cursor, ordering="pk", limit=self.page_size)
+            if any(item.obj.pk <= cursor for item in page):
+                logging.info("Server ignored the pk__gt filter, falling back to paging")
+                self.cursor_supported = False
+                return None
+            pks = [item.obj.pk for item in page]
+            if pks != sorted(pks):
+                # Under another order (e.g. the default -date) the last pk
+                # of a page is not its largest, entries would be skipped
+                logging.info("Server ignored the pk ordering, falling back to paging")
+                self.cursor_supported = False
+                return None
+            self.cursor_supported = True
+            new_items.extend(page)
+            if len(page) < self.page_size:
+                break
+            cursor = pks[-1]
+
+        self.advance(new_items)
+        return new_items
+
+    # Fallback for servers without the pk filter: page newest first until
+    # the high-water mark is reached
+    def _fetch_newest_first(self) -> List[CachedStockItemTracking]:
+        new_items = {}
+        offset = 0
+        while True:
+            page = CachedStockItemTracking.list(api, ordering="-pk", limit=self.page_size, offset=offset)
+            fresh = [item for item in page if item.obj.pk > self.high_water_mark]
+            for item in fresh:
+                new_items[item.obj.pk] = item
+            if len(fresh) < len(page) or len(page) < self.page_size:
+                break
+            offset += self.page_size
+
+        result = sorted(new_items.values(), key=lambda item: item.obj.pk)
+        self.advance(result)
+        return result
+
+# Backfills the stock tracking history, newest first, until a time window is
+# crossed. The page size adapts to the observed latency and payload size,
+# and once the total count is known several pages are fetched concurrently.
+class HistoryBackfill():
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+        initial_page_size: int = 10,
+        max_page_size: int = 200,
+        target_page_seconds: float = 0.3,
+        target_page_bytes: int = 256 * 1024,
+        parallel_pages: int = 4,
+    ):
+        self.min_page_size = max(1, initial_page_size)
+        self.max_page_size = max(self.min_page_size, max_page_size)
+        self.page_size = self.min_page_size
+        self.target_page_seconds = target_page_seconds
+        self.target_page_bytes = target_page_bytes
+        self.parallel_pages = max(1, parallel_pages)
+        self.requests = 0
+        self._lock = Lock()
+
+    def _adapt(self, rows: int, seconds: float, size_bytes: int):
+        with self._lock:
+            if rows < self.page_size:
+                return
+            if seconds > self.target_page_seconds or size_bytes > self.target_page_bytes:
+                self.page_size = max(self.min_page_size, self.page_size // 2)
+            elif seconds < self.target_page_seconds / 2 and size_bytes < self.target_page_bytes / 2:
+                self.page_size = min(self.max_page_size, self.page_size * 2)
+
+    # Returns one page and the total number of entries on the server
+    def fetch_page(self, offset: int, limit: int) -> Tuple[List[CachedStockItemTracking], int]:
+        start = time.perf_counter()
+        response = api.get(url=StockItemTracking.URL, params={"limit": limit, "offset": offset})
+        elapsed = time.perf_counter() - start
+        self.requests += 1
+
+        if isinstance(response, dict):
+            count = response.get("count", 0)
+            results = response.get("results") or []
+        else:
+            results = response or []
+            count = len(results)
+
+        self._adapt(len(results), elapsed, len(json.dumps(results)))
+        logging.debug("History page offset=%d limit=%d took %.0f ms", offset, limit, elapsed * 1000)
+        items = [CachedStockItemTracking(obj=StockItemTracking(api, data=data)) for data in results]
+        return (items, count)
+
+    @staticmethod
+    def crosses(page: List[CachedStockItemTracking], oldest: datetime) -> bool:
+        return any(item.datetime() <= oldest for item in page)
+
+    # Yields pages newest first, stopping after the page that crosses 'oldest'
+    def pages(self, oldest: datetime) -> Iterator[List[CachedStockItemTracking]]:
+        limit = self.page_size
+        page, count = self.fetch_page(0, limit)
+        yield page
+        if len(page) < limit or self.crosses(page, oldest):
+            return
+
+        offset = len(page)
+        with ThreadPoolExecutor(max_workers=self.parallel_pages) as executor:
+            pending = deque()
+            try:
+                while offset < count or len(pending) > 0:
+                    while len(pending) < self.parallel_pages and offset < count:
+                        limit = self.page_size
+                        pending.append(executor.submit(self.fetch_page, offset, limit))
+                        offset += limit
+
+                    page, _ = pending.popleft().result()
+                    yield page
+                    if len(page) == 0 or self.crosses(page, oldest):
+                        return
+            finally:
+                for future in pending:
+                    future.cancel()
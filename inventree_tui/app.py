@@ -18,15 +18,35 @@ from textual.widgets import (
 )
 
 from .error_screen import ErrorDialogScreen, IgnorableErrorEvent
-from .status import StatusChanged
+from .status import StatusChanged, QueueDepthChanged, ConnectionStateChanged
+from . import startup_profile
+from .update_check import cached_latest_version, store_latest_version
 from .tabs import (
     TransferItemsTab,
     CheckInItemsTab,
     PartSearchTab,
     StockOpsTab
 )
-from inventree_tui.sound import Sound, play_sound
+from inventree_tui.sound import (
+    Sound,
+    play_sound,
+    warm_up,
+    log_cache_stats,
+    start_scheduler,
+    stop_scheduler,
+    start_presynth,
+    stop_presynth,
+)
 from inventree_tui.settings import settings
+from inventree_tui.api import (
+    api,
+    async_api,
+    start_journal,
+    stop_journal,
+    requests_in_flight,
+    InventreeScanner,
+    UnconfirmedOperationError,
+)
 
 handlers = [TextualHandler()]
 if settings.log_filename is not None:
@@ -53,6 +73,12 @@ class InventreeApp(App):
 
     def __init__(self):
         self.app_status_text = None
+        self.queue_status_text = None
+        self.connection_status_text = None
+        self.connection_state = "disconnected"
+        self.queue_depth = 0
+        # Queued operations that failed since the queue was last empty
+        self.queue_failures = 0
         super().__init__()
 
     def compose(self) -> ComposeResult:
@@ -69,12 +95,16 @@ class InventreeApp(App):
         with Vertical(id="footer"):
             self.app_status_text = Label(self.status_message,id="app_status_text")
             yield self.app_status_text
+            self.queue_status_text = Label("", id="queue_status_text")
+            yield self.queue_status_text
+            self.connection_status_text = Label("", id="connection_status_text")
+            yield self.connection_status_text
 
     async def on_ignorable_error_event(self, event: IgnorableErrorEvent):
         dialog = ErrorDialogScreen()
         dialog.title = event.title
         dialog.exception_message = event.message
-        self.play_sound("failure")
+        play_sound("failure", origin=event.origin)
         await self.push_screen(dialog)
 
 
@@ -84,16 +114,25 @@ class InventreeApp(App):
         package_name = __package__ or "inventree_tui"
         current_version = importlib.metadata.version(package_name)
 
-        # Make a request to the PyPI API to get the latest version information
-        package_url = f"https://pypi.org/pypi/{package_name}/json"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(package_url)
+        # Reuse a recent result instead of asking PyPI on every start
+        latest_version = cached_latest_version(package_name, settings.update_check_ttl_hours * 3600)
+        if latest_version is None:
+            # Make a request to the PyPI API to get the latest version information
+            package_url = f"https://pypi.org/pypi/{package_name}/json"
+            try:
+                async with httpx.AsyncClient() as client:
+                    response = await client.get(package_url)
 
-        if response.status_code == 200:
-            # Parse the JSON response
-            data = response.json()
-            latest_version = data["info"]["version"]
+                if response.status_code == 200:
+                    # Parse the JSON response
+                    data = response.json()
+                    latest_version = data["info"]["version"]
+                    store_latest_version(package_name, latest_version)
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                # Offline, or PyPI answered with something unexpected
+                logging.info("Update check failed: %s", e)
 
+        if latest_version is not None:
             # Compare the versions
             if latest_version > current_version:
                 s = f"""\
@@ -115,31 +154,106 @@ InvenTree TUI up to date ({current_version})"""))
         if self.app_status_text is not None:
             self.app_status_text.update(status_message)
 
+    def on_queue_depth_changed(self, message: QueueDepthChanged):
+        drained = message.depth < self.queue_depth
+        self.queue_depth = message.depth
+        if self.queue_status_text is not None:
+            text = f"Queued operations: {message.depth}" if message.depth > 0 else ""
+            self.queue_status_text.update(text)
+        if drained:
+            # Show the submitted adjustments in the history
+            self.query_one(StockOpsTab).fetch_recent()
+        if drained and message.depth == 0:
+            if self.queue_failures > 0:
+                s = "s" if self.queue_failures > 1 else ""
+                self.post_message(StatusChanged(self, f"Queued operations sent, {self.queue_failures} operation{s} failed"))
+            else:
+                self.post_message(StatusChanged(self, "All queued operations were sent to the server"))
+            self.queue_failures = 0
+
+    def on_connection_state_changed(self, message: ConnectionStateChanged):
+        reconnected = message.state == "connected" and self.connection_state == "failed"
+        self.connection_state = message.state
+        if message.state == "connected":
+            startup_profile.mark("api connected")
+            for tab in self.query(StockOpsTab):
+                tab.retry_part_names()
+        if reconnected:
+            self.query_one(StockOpsTab).fetch_recent()
+            for scanner in self.query(InventreeScanner):
+                scanner.retry_local_index()
+        if self.connection_status_text is None:
+            return
+        labels = {
+            "disconnected": "Offline",
+            "connecting": "Connecting...",
+            "connected": "Connected",
+            "failed": "Connection failed",
+        }
+        self.connection_status_text.update(labels.get(message.state, message.state))
+        self.connection_status_text.set_class(message.state == "connected", "connected")
+        self.connection_status_text.set_class(message.state == "failed", "failed")
+
+    # Connects in the background so the first frame does not wait on the server
+    @work(exclusive=True, thread=True, group="connect")
+    def connect_api(self):
+        try:
+            api.connect()
+        except Exception as e:
+            self.post_message(StatusChanged(self, f"Could not connect to {api.base_url}: {e}"))
+
+    @work(exclusive=True, thread=True, group="sound")
+    def warm_up_sounds(self):
+        warm_up()
+        startup_profile.mark("sounds ready")
+        start_presynth(is_busy=requests_in_flight)
+
+    def start_journal(self):
+        def on_change(depth):
+            self.post_message(QueueDepthChanged(self, depth))
+
+        def on_failed(op, e):
+            self.queue_failures += 1
+            pks = ", ".join(f"#{pk}" for pk in op.pks())
+            if isinstance(e, UnconfirmedOperationError):
+                s = f"""\
+The connection failed while sending a queued {op.method} operation ({pks}).
+It may or may not have been applied and was not retried, please check the stock history: {e.error}"""
+                self.post_message(IgnorableErrorEvent(self, "Queued Operation Unconfirmed", s))
+                return
+            s = f"The server rejected a queued {op.method} operation ({pks}): {e}"
+            self.post_message(IgnorableErrorEvent(self, "Queued Operation Failed", s))
+
+        start_journal(on_change=on_change, on_failed=on_failed)
+
     def initialization(self):
+        startup_profile.mark("first frame")
+        startup_profile.log_report()
+        self.warm_up_sounds()
         if settings.check_for_updates:
             self.check_for_updates()
 
+    async def on_unmount(self):
+        stop_journal()
+        stop_presynth()
+        stop_scheduler()
+        log_cache_stats()
+        await async_api.aclose()
+
     def on_mount(self):
+        startup_profile.mark("app mounted")
+        api.add_state_listener(lambda state: self.post_message(ConnectionStateChanged(self, state)))
+        self.post_message(ConnectionStateChanged(self, api.connection_state))
+        self.connect_api()
+        self.start_journal()
+        start_scheduler()
         _input = cast(Input, self.query_one("#transfer_destination_input"))
         _input.focus()
         self.call_after_refresh(self.initialization)
 
 
-    @work(exclusive=False, thread=True)
-    def play_sound(self, sound_name: str):
-        play_sound(sound_name)
-
-    @work(exclusive=False, thread=True)
-    def play_sound_fn(self, fn):
-        fn()
-
     def on_sound(self, event: Sound):
-        if not settings.sound_enabled:
-            return
-        if event.name is not None:
-            self.play_sound(event.name)
-        if event.fn is not None:
-            self.play_sound_fn(event.fn)
+        play_sound(event.name, event.fn, key=event.key, origin=event.origin, fallback=event.fallback)
 
     def action_show_tab(self, tab: str) -> None:
         """Switch to a new tab."""
@@ -1,6 +1,7 @@
 import argparse
 import os
 import sys
+from . import startup_profile
 from .settings import load_yaml_config, generate_default_settings
 
 def create_env(args):
@@ -48,6 +49,11 @@ def create_parser():
         type=str,
         help="Specify a custom configuration file to use (default: None, uses built-in defaults)"
     )
+    app_parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="Print a timeline of imports and initialization after the application exits"
+    )
 
     # Add the "generate-config" subparser
     generate_config_parser = subparsers.add_parser(
@@ -61,29 +67,65 @@ def create_parser():
         help="Specify the output filename for the configuration file (default: config.yaml)"
     )
 
+    # Add the "warm-cache" subparser
+    warm_cache_parser = subparsers.add_parser(
+        "warm-cache",
+        help="Fill the local object store from the server",
+        description="Download parts and stock locations into the persistent object store, so the next start is warm."
+    )
+    warm_cache_parser.add_argument(
+        "-c", "--config-filename",
+        default=None,
+        type=str,
+        help="Specify a custom configuration file to use (default: None, uses built-in defaults)"
+    )
+    warm_cache_parser.add_argument(
+        "--page-size",
+        default=500,
+        type=int,
+        help="Number of objects to request per API call (default: 500)"
+    )
+
     return parser
 
 
 def main():
     parser = create_parser()
-    args = parser.parse_args()
+    argv = sys.argv[1:]
+    if len(argv) == 0 or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        # No command was provided, default to "app" (and pass on its options)
+        argv = ["app"] + argv
+    args = parser.parse_args(argv)
 
     if args.command == "create-env":
         create_env(args)
     elif args.command == "generate-config":
         generate_config(args)
-    else:  # Default to "app" command
-        if args.command is None:
-            # If no command was provided, manually set it to "app" and reparse
-            args = parser.parse_args(['app'] + sys.argv[1:])
+    elif args.command == "warm-cache":
+        warm_cache(args)
+    else:
+        if args.startup_profile:
+            startup_profile.enable()
 
         if args.config_filename is not None:
             load_yaml_config(args.config_filename)
-
+        startup_profile.mark("config loaded")
+
+        # Imported one by one so that the profile shows where the time goes
+        # pylint: disable=import-outside-toplevel,unused-import
+        import textual.app
+        startup_profile.mark("textual imported")
+        import inventree_tui.api
+        startup_profile.mark("api modules imported")
         from inventree_tui.app import InventreeApp
+        startup_profile.mark("app imported")
+
         app = InventreeApp()
         app.run()
 
+        if startup_profile.enabled:
+            print(startup_profile.report())
+
 def generate_config(args):
     filename = args.output_filename
     if os.path.exists(filename):
@@ -93,3 +135,21 @@ def generate_config(args):
             return
 
     generate_default_settings(filename)
+
+def warm_cache(args):
+    if args.config_filename is not None:
+        load_yaml_config(args.config_filename)
+
+    from inventree.part import Part
+    from inventree.stock import StockLocation
+    from inventree_tui.api.object_store import object_store, warm_cache as warm_store
+
+    if object_store is None:
+        print("The object store is disabled in the configuration.")
+        return
+
+    # Stock items change too often to be served from the store
+    classes = [StockLocation, Part]
+    for name, count in warm_store(object_store, classes, page_size=args.page_size):
+        print(f"Stored {count} {name} objects.")
+    print(f"Object store: {object_store.path}")
@@ -20,8 +20,10 @@ class ErrorDialogScreen(Screen):
         self.dismiss()
 
 class IgnorableErrorEvent(Event):
-    def __init__(self, sender, title, message):
+    # 'origin' is the time.monotonic() of the scan that failed, if any
+    def __init__(self, sender, title, message, origin: float | None = None):
         super().__init__()
         self.sender = sender
         self.title = title
         self.message = message
+        self.origin = origin
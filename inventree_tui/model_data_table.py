@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import logging
-from typing import Type, Dict, cast, TypeVar, Generic
+from threading import Lock
+from typing import Type, Dict, Set, cast, TypeVar, Generic
 from pydantic import ValidationError
 
 from textual import work
@@ -23,6 +24,11 @@ from inventree_tui.components import ButtonBar
 from inventree_tui.api import RowBaseModel
 
 T = TypeVar('T', bound=RowBaseModel)
+
+# DataTable showing one row per model in 'data'.
+# Rows are refreshed incrementally: adding, removing or assigning a field of
+# a row model marks its key dirty, and update() only adds, removes or patches
+# the dirty rows. Sorting is deferred so a burst of changes sorts once.
 class ModelDataTable(DataTable):
     def __init__(self,
             model_class: Type[T],
@@ -36,6 +42,12 @@ class ModelDataTable(DataTable):
         self.sort_column_key = None
         self.editable = editable
         self.allow_delete = allow_delete
+        # Keys of the rows to add, remove or patch on the next update
+        self._dirty : Set[str] = set()
+        self._dirty_lock = Lock()
+        # Compare every row on the next update, e.g. after 'data' was replaced
+        self._refresh_all = True
+        self._sort_pending = False
 
         super().__init__(*args, **kwargs)
         self.model_class = model_class
@@ -65,51 +77,89 @@ Not a valid sort column, options are {model_class.get_field_names(by_alias=True)
         if key in self.data:
             return False
         self.data[key] = item
+        item.add_observer(self.on_row_changed)
+        self.mark_dirty(key)
         await self.update()
         return True
 
+    async def remove_item(self, key: str):
+        item = self.data.pop(key, None)
+        if item is not None:
+            item.remove_observer(self.on_row_changed)
+            self.mark_dirty(key)
+        await self.update()
+
     async def clear_data(self):
+        for item in self.data.values():
+            item.remove_observer(self.on_row_changed)
         self.data = {}
+        self.clear()
+        with self._dirty_lock:
+            self._dirty.clear()
         await self.update()
 
     def obj_row_key(self, obj: T) -> RowKey:
         return RowKey(value=str(hash(obj)))
 
+    def mark_dirty(self, key: str):
+        with self._dirty_lock:
+            self._dirty.add(key)
+
+    # Row observer, may be called from worker threads
+    def on_row_changed(self, row: T, field: str):
+        self.mark_dirty(cast(str, self.obj_row_key(row).value))
+
     async def update(self, data: Dict[str, T] | None = None) -> None:
-        if data is None:
-            data = self.data
+        if data is not None and data is not self.data:
+            for item in self.data.values():
+                item.remove_observer(self.on_row_changed)
+            for item in data.values():
+                item.add_observer(self.on_row_changed)
+            self.data = data
+            self._refresh_all = True
+
+        with self._dirty_lock:
+            dirty = self._dirty
+            self._dirty = set()
+        if self._refresh_all:
+            self._refresh_all = False
+            dirty.update(self.data.keys())
+            dirty.update(cast(str, row_key.value) for row_key in self.rows if row_key.value is not None)
 
-        #columns = self.model_class.get_field_names()
         columns = self.model_class.column_fields()
 
         needs_sorted = False
-        for key, obj in data.items():
+        for key in dirty:
+            obj = self.data.get(key)
+            if obj is None:
+                if key in self.rows:
+                    self.remove_row(key)
+                continue
+
             if key not in self.rows:
-                values = [getattr(obj, col) for col in columns]
-                logging.info("ADDING ROW %s", values)
-                logging.info("ADDING ROW KEY %s", key)
-                self.add_row(*values, key=key)
+                self.add_row(*[getattr(obj, col) for col in columns], key=key)
                 needs_sorted = True
-
-        keys = list(self.rows.keys())
-        for row_key in keys:
-            if row_key.value not in data:
-                self.remove_row(row_key)
-
-        for row_key, _ in self.rows.items():
-            if row_key.value is None:
                 continue
-            obj = self.data[row_key.value]
-            #cells = self.get_row(row_key)
-            for col_key, _ in self.columns.items():
-                if col_key != "delete_button" and col_key.value is not None:
-                    current_value = self.get_cell(row_key, col_key)
-                    new_value = getattr(obj, col_key.value)
-                    if current_value != new_value:
-                        needs_sorted = True
-                        self.update_cell(row_key, col_key, value=new_value)
+
+            for col in columns:
+                new_value = getattr(obj, col)
+                if self.get_cell(key, col) != new_value:
+                    self.update_cell(key, col, new_value)
+                    needs_sorted = needs_sorted or col == self.sort_column_key
 
         if self.sort_column_key is not None and needs_sorted:
+            self.schedule_sort()
+
+    # Sorts once after the pending messages, rather than after every change
+    def schedule_sort(self):
+        if self._sort_pending:
+            return
+        self._sort_pending = True
+        self.call_later(self.sort_rows)
+
+    def sort_rows(self):
+        self._sort_pending = False
+        if self.sort_column_key is not None:
             self.sort(self.sort_column_key, reverse=True)
 
     async def on_data_table_row_selected(self, message: DataTable.RowSelected):
@@ -124,9 +174,8 @@ Not a valid sort column, options are {model_class.get_field_names(by_alias=True)
             row = self.ordered_rows[self.cursor_row]
             row_key = row.key
             key = cast(str, row_key.value)
-            del self.data[key]
             self.move_cursor(row=self.cursor_row-1)
-            await self.update()
+            await self.remove_item(key)
 
 class RowEditScreen(Screen,  Generic[T]):
     dialog_title = reactive("Row Edit", recompose=True)
@@ -13,7 +13,58 @@ class StockOpsTabSettings(BaseSettings):
     history_delta_minutes: int = Field(0, ge=0, description="Minutes to look back in history")
     history_delta_hours: int = Field(8, ge=0, description="Hours to look back in history")
     history_delta_days: int = Field(0, ge=0, description="Days to look back in history")
-    history_chunk_size: int = Field(10, ge=0, description="Number of history items to fetch every API call")
+    history_chunk_size: int = Field(10, ge=1, description="Number of history items to fetch in the first API call")
+    history_max_chunk_size: int = Field(200, ge=1, description="Maximum number of history items to fetch every API call")
+    history_target_page_ms: int = Field(300, ge=1, description="Page sizes adapt to keep each history request under this time")
+    history_parallel_pages: int = Field(4, ge=1, description="Number of history pages to fetch concurrently")
+
+class ScannerSettings(BaseSettings):
+    search_debounce_ms: int = Field(150, ge=0, description="Milliseconds to wait after a keystroke before searching")
+    search_cache_terms: int = Field(50, ge=0, description="Number of recent autocomplete searches to keep results for (0 disables the limit)")
+    local_index_refresh_seconds: int = Field(600, ge=0, description="Seconds between reloads of local autocomplete indexes (0 disables)")
+
+class SoundSettings(BaseSettings):
+    low_latency: bool = Field(True, description="Open the audio device with a small buffer (buffer_size) so sounds start sooner")
+    buffer_size: int = Field(256, ge=32, le=8192, description="Audio buffer in samples in low latency mode, rounded up to a power of two (too small may crackle)")
+    sample_rate: int = Field(44100, ge=8000, description="Requested output sample rate, chimes are rendered at the rate the device opens with")
+    mixer_channels: int = Field(8, ge=2, description="Number of mixer channels opened up front, two are reserved for chimes and speech")
+    latency_target_ms: int = Field(50, ge=0, description="Target time from a scan to the start of its sound, slower sounds are logged (0 disables)")
+    queue_size: int = Field(16, ge=1, description="Maximum number of sounds waiting to be played")
+    stale_speech_ms: int = Field(1500, ge=0, description="Speech that could not start within this many milliseconds is dropped")
+    tts_backend: str = Field("auto", pattern="^(auto|local|gtts)$", description="Text-to-speech engine: local, gtts, or auto (local if installed, else gtts)")
+    tts_command: list[str] | None = Field(None, description="Local engine command, with {text}, {lang} and {output} placeholders (default: espeak-ng/espeak)")
+    tts_workers: int = Field(2, ge=1, description="Number of local text-to-speech processes that may run at once")
+    tts_latency_budget_ms: int = Field(100, ge=0, description="Play the chime instead if speech is not ready within this many milliseconds (0 always waits)")
+    tts_cache_max_mb: int = Field(64, ge=0, description="Disk budget for cached text-to-speech audio in MB (0 disables the limit)")
+    tts_memory_cache_size: int = Field(64, ge=0, description="Number of decoded text-to-speech phrases kept in memory (0 disables the limit)")
+    presynth_enabled: bool = Field(True, description="Synthesize likely phrases (part and location names) in the background while idle")
+    presynth_network: bool = Field(False, description="Also synthesize in the background with a network backend (gtts), which sends every suggested phrase to the service")
+    presynth_cpu_percent: int = Field(25, ge=1, le=100, description="Share of time the background synthesis may spend synthesizing")
+    presynth_max_mb: int = Field(32, ge=0, description="Background synthesis stops once the text-to-speech cache reaches this size in MB (0 disables the limit)")
+    presynth_max_pending: int = Field(500, ge=1, description="Maximum number of phrases waiting for background synthesis, oldest are dropped")
+
+class ObjectCacheSettings(BaseSettings):
+    ttl_seconds: int = Field(300, ge=0, description="Seconds before a cached part/location is refetched (0 disables expiry)")
+    max_size: int = Field(2048, ge=0, description="Maximum number of cached objects (0 disables the limit)")
+
+class ObjectStoreSettings(BaseSettings):
+    enabled: bool = Field(True, description="Keep fetched objects on disk and show them immediately on the next start")
+    path: str | None = Field(None, description="Object store database file (default: ~/.cache/inventree-tui/objects.sqlite3)")
+    max_entries: int = Field(20000, ge=0, description="Maximum number of stored objects, least recently used are evicted (0 disables the limit)")
+
+class ApiClientSettings(BaseSettings):
+    timeout_seconds: float = Field(10, gt=0, description="Timeout for each async API request")
+    max_connections: int = Field(10, ge=1, description="Maximum number of pooled HTTP connections")
+    max_keepalive_connections: int = Field(10, ge=0, description="Maximum number of idle keep-alive connections")
+    http2: bool = Field(False, description="Use HTTP/2 if the 'h2' package is installed")
+    max_parallel_writes: int = Field(8, ge=1, description="Maximum number of concurrent update requests")
+
+class JournalSettings(BaseSettings):
+    enabled: bool = Field(True, description="Queue stock changes in a local journal and submit them in the background")
+    path: str | None = Field(None, description="Journal database file (default: ~/.local/share/inventree-tui/journal.sqlite3)")
+    batch_size: int = Field(50, ge=1, description="Maximum number of queued operations to submit in one request")
+    retry_base_seconds: float = Field(1, gt=0, description="Initial delay before retrying a failed submission")
+    retry_max_seconds: float = Field(60, gt=0, description="Maximum delay between retries")
 
 class Settings(BaseSettings):
     # General settings
@@ -21,6 +72,7 @@ class Settings(BaseSettings):
     sound_enabled: bool = Field(False, description="Enable sound effects")
     tts_enabled: bool = Field(False, description="Enable text-to-speech")
     check_for_updates: bool = Field(True, description="Check for updates to the PyPi package on startup")
+    update_check_ttl_hours: int = Field(24, ge=0, description="Hours to reuse the result of the last update check (0 checks every start)")
 
     inventree_api_host: str | None = Field(None, env="API_HOST", description="InvenTree API host URL")
     inventree_api_token: str | None = Field(None, env="API_TOKEN", description="InvenTree API token")
@@ -28,6 +80,12 @@ class Settings(BaseSettings):
     # Nested settings
     part_search_tab: PartSearchTabSettings = Field(default_factory=PartSearchTabSettings, description="Settings for the part search tab")
     stock_ops_tab: StockOpsTabSettings = Field(default_factory=StockOpsTabSettings, description="Settings for the stock operations tab")
+    scanner: ScannerSettings = Field(default_factory=ScannerSettings, description="Settings for scanner inputs")
+    sound: SoundSettings = Field(default_factory=SoundSettings, description="Settings for sound effects and text-to-speech")
+    api_client: ApiClientSettings = Field(default_factory=ApiClientSettings, description="Settings for the async API client")
+    object_cache: ObjectCacheSettings = Field(default_factory=ObjectCacheSettings, description="Settings for the shared API object cache")
+    object_store: ObjectStoreSettings = Field(default_factory=ObjectStoreSettings, description="Settings for the persistent object store")
+    journal: JournalSettings = Field(default_factory=JournalSettings, description="Settings for the offline operation journal")
 
     model_config = SettingsConfigDict(
         env_file='.env',
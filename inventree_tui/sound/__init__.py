@@ -1,25 +1,43 @@
 
 
+import sys
+from threading import Lock
 from textual.events import Event
 import logging
 
 from inventree_tui.settings import settings
+from . import scheduler
+from .presynth import PreSynthesizer
 
 class NullSound():
     def play(self):
         pass
 
-if settings.sound_enabled:
-    if settings.tts_enabled:
-        from .generation import tts as _tts
-    from .chimes import success as success_chime, failure as failure_chime
-    #import .generation as generation
-    # Generate the sounds
-    success = success_chime()
-    failure = failure_chime()
-else:
-    success = NullSound()
-    failure = NullSound()
+# Chimes are synthesized on first use (or by warm_up() in the background),
+# so numpy and pygame are not imported while the application starts
+_chimes = {}
+_chimes_lock = Lock()
+
+def chime(name: str):
+    if not settings.sound_enabled:
+        return NullSound()
+    with _chimes_lock:
+        if name not in _chimes:
+            from . import chimes
+            _chimes[name] = getattr(chimes, name)()
+        return _chimes[name]
+
+# Opens the audio device and renders the chimes ahead of the first scan
+def warm_up():
+    if not settings.sound_enabled:
+        return
+    if scheduler.audio_scheduler is not None:
+        scheduler.audio_scheduler.open_channels()
+    chime("success")
+    chime("failure")
+
+def _normalize(text):
+    return text.lower().strip()
 
 def tts(text):
     if not settings.sound_enabled:
@@ -27,19 +45,101 @@ def tts(text):
     if not (settings.tts_enabled):
         return NullSound()
 
-    return _tts(text.lower().strip())
+    from .generation import tts as _tts
+    return _tts(_normalize(text))
+
+def _presynthesize(text):
+    from .generation import presynthesize
+    return presynthesize(text)
+
+def _tts_cache_bytes():
+    from .generation import tts_cache
+    return tts_cache.disk_bytes()
+
+def presynth_enabled():
+    return settings.sound_enabled and settings.tts_enabled and settings.sound.presynth_enabled
 
-def play_sound(sound_name: str):
+# Phrases can be suggested before the worker is started, they wait until then
+presynthesizer = PreSynthesizer(
+    _presynthesize,
+    _tts_cache_bytes,
+    cpu_fraction=settings.sound.presynth_cpu_percent / 100,
+    max_bytes=settings.sound.presynth_max_mb * 1024 * 1024,
+    max_pending=settings.sound.presynth_max_pending,
+)
+
+# Queues phrases that are likely to be spoken soon for background synthesis
+def suggest_phrases(phrases):
+    if not presynth_enabled():
+        return
+    presynthesizer.suggest(_normalize(phrase) for phrase in phrases)
+
+# 'is_busy' returns True while other work (e.g. API requests) should not be
+# slowed down; queued or synthesizing sounds always pause the worker.
+# Network backends only pre-synthesize if presynth_network allows it, as
+# every suggested phrase would be sent to the service.
+def start_presynth(is_busy):
+    if not presynth_enabled() or presynthesizer.is_alive():
+        return
+    from .generation import tts_backend
+    backend = tts_backend().name
+    if backend != "local" and not settings.sound.presynth_network:
+        logging.info("Not pre-synthesizing with the %s text-to-speech backend", backend)
+        return
+    def busy():
+        audio_scheduler = scheduler.audio_scheduler
+        return is_busy() or (audio_scheduler is not None and audio_scheduler.busy())
+    presynthesizer.is_busy = busy
+    presynthesizer.start()
+
+def stop_presynth():
+    if presynthesizer.is_alive():
+        presynthesizer.log_stats()
+        presynthesizer.stop()
+
+def log_cache_stats():
+    # Only if text-to-speech was used, to avoid importing pygame just for this
+    generation = sys.modules.get(f"{__name__}.generation")
+    if generation is not None:
+        generation.tts_cache.log_stats()
+
+def start_scheduler():
     if not settings.sound_enabled:
+        return None
+    return scheduler.start_scheduler(
+        max_queue=settings.sound.queue_size,
+        stale_seconds=settings.sound.stale_speech_ms / 1000,
+        budget_seconds=settings.sound.tts_latency_budget_ms / 1000,
+        num_channels=settings.sound.mixer_channels,
+        target_seconds=settings.sound.latency_target_ms / 1000,
+        synth_workers=settings.sound.tts_workers,
+    )
+
+def stop_scheduler():
+    scheduler.stop_scheduler()
+
+# Queues a sound on the audio scheduler.
+# 'name' is a chime ("success" or "failure"), 'fn' returns the speech to
+# play (e.g. tts(...)) and is run off the UI thread. Queued speech is
+# dropped when a newer sound with the same 'key' is played. 'origin' is the
+# time.monotonic() of the scan that caused the sound, to measure latency.
+# 'fallback' is the chime played for speech without a chime that misses the
+# latency budget (None plays nothing).
+def play_sound(name: str | None = None, fn = None, key: str | None = None, origin: float | None = None,
+    fallback: str | None = None):
+    if not settings.sound_enabled or scheduler.audio_scheduler is None:
         return False
-    if sound_name == "success":
-        success.play()
-    elif sound_name == "failure":
-        failure.play()
+    scheduler.audio_scheduler.submit(name=name, fn=fn, key=key, origin=origin, fallback=fallback)
+    return True
 
 class Sound(Event):
-    def __init__(self, sender, name: str = None, fn = None):
+    # pylint: disable=too-many-arguments
+    def __init__(self, sender, name: str = None, fn = None, key: str = None, origin: float = None,
+        fallback: str = None):
         super().__init__()
         self.sender = sender
         self.name = name
         self.fn = fn
+        self.key = key
+        self.origin = origin
+        self.fallback = fallback
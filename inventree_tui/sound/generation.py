@@ -1,79 +1,97 @@
 
 from io import BytesIO
 import functools
-import pickle
+import json
+import logging
 from pathlib import Path
 from abc import ABC, abstractmethod
 import numpy as np
 import os
-import tempfile
 import hashlib
 
 # Yes it seems a bit silly to use pygame just for sound,
 # but it's the most well supported cross-platform package
 # for playing sound, without being *too* large
-import wave
-from pygame import mixer, sndarray
+from threading import Lock
+from pygame import mixer, sndarray, AUDIO_ALLOW_FREQUENCY_CHANGE
 from inventree_tui.settings import settings
-
-mixer.init(frequency=44100, size=-16, channels=1)
-
-# Wrapper for caching generated pygame sounds as WAV files
-def persistent_sound_cache(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Create the cache directory if it doesn't exist
-        cache_dir = Path(tempfile.gettempdir()) / "inventree-tui" / "sounds"
-        cache_dir.mkdir(parents=True, exist_ok=True)
-
-        # Create a unique key for the function call
-        key = args + tuple(sorted(kwargs.items()))
-
-        # Path for the pickle file that tracks the cache
-        cache_index_path = cache_dir / "sound_cache_index.pkl"
-
-        # Load the cache index
-        if cache_index_path.exists():
-            with open(cache_index_path, "rb") as f:
-                cache_index = pickle.load(f)
-        else:
-            cache_index = {}
-
-        # Check if the result is in the cache
-        if str(key) in cache_index:
-            sound_path = cache_index[str(key)]
-            return mixer.Sound(sound_path)
-
-        # If not in cache, call the original function
-        sound = func(*args, **kwargs)
-
-        # Save the sound to a temporary WAV file
-        temp_path = cache_dir / f"sound_{os.urandom(8).hex()}.wav"
-
-        # Get sound array and properties
-        array_sample = sndarray.array(sound)
-        n_channels = 1 if len(array_sample.shape) == 1 else array_sample.shape[1]
-        sample_width = array_sample.dtype.itemsize
-        frame_rate = mixer.get_init()[0]
-
-        # Open a new wave file
-        with wave.open(str(temp_path), "wb") as wav_file:
-            # Set parameters
-            wav_file.setnchannels(n_channels)
-            wav_file.setsampwidth(sample_width)
-            wav_file.setframerate(frame_rate)
-
-            # Write data
-            wav_file.writeframes(array_sample.tobytes())
-
-        # Update the cache index
-        cache_index[str(key)] = str(temp_path)
-        with open(cache_index_path, "wb") as f:
-            pickle.dump(cache_index, f)
-
-        return sound
-
-    return wrapper
+from .sound_cache import SoundCache, default_cache_dir, remove_legacy_cache
+from .tts_backends import create_backend
+
+_mixer_lock = Lock()
+# pygame's default, used unless the low latency mode is enabled
+DEFAULT_BUFFER_SIZE = 512
+_buffer_size = DEFAULT_BUFFER_SIZE
+
+# Bump when the synthesis code changes the output for the same parameters
+PCM_CACHE_VERSION = 2
+
+def pcm_cache_dir() -> Path:
+    return Path(os.path.expanduser("~")) / ".cache" / "inventree-tui" / "chimes"
+
+# The mixer is opened on first use rather than at import time, with the
+# buffer and sample rate from the sound settings. The device may open with
+# another sample rate; chimes are rendered at that rate (see Melody), so
+# they are not resampled on playback.
+def init_mixer():
+    global _buffer_size
+    with _mixer_lock:
+        if mixer.get_init() is not None:
+            return
+        _buffer_size = DEFAULT_BUFFER_SIZE
+        if settings.sound.low_latency:
+            # SDL expects a power of two
+            _buffer_size = 1 << (settings.sound.buffer_size - 1).bit_length()
+        mixer.init(
+            frequency=settings.sound.sample_rate,
+            size=-16,
+            channels=1,
+            buffer=_buffer_size,
+            allowedchanges=AUDIO_ALLOW_FREQUENCY_CHANGE,
+        )
+        logging.info("Audio output: %s, buffer of %d samples", mixer.get_init(), _buffer_size)
+
+def output_sample_rate() -> int:
+    init_mixer()
+    return mixer.get_init()[0]
+
+# Time for a sound to get through the output buffer once it is started
+def output_latency() -> float:
+    return _buffer_size / output_sample_rate()
+
+# Envelopes only depend on their parameters and length, so each one is
+# rendered once (as float32) and shared between notes and melodies
+@functools.lru_cache(maxsize=256)
+def _envelope(attack_ms, decay_ms, sustain_level, release_ms, sample_rate, total_samples):
+    attack_samples = int(attack_ms * sample_rate / 1000)
+    decay_samples = int(decay_ms * sample_rate / 1000)
+    release_samples = int(release_ms * sample_rate / 1000)
+
+    # Calculate sustain samples based on the duration, never negative
+    sustain_samples = max(0, total_samples - attack_samples - decay_samples - release_samples)
+
+    envelope = np.zeros(total_samples, dtype=np.float32)
+
+    # Attack
+    attack_end = min(attack_samples, total_samples)
+    envelope[:attack_end] = np.linspace(0, 1, attack_end, dtype=np.float32)
+
+    if attack_end < total_samples:
+        # Decay
+        decay_end = min(attack_samples + decay_samples, total_samples)
+        envelope[attack_end:decay_end] = np.linspace(1, sustain_level, decay_end - attack_end, dtype=np.float32)
+
+        if decay_end < total_samples:
+            # Sustain
+            sustain_end = min(attack_samples + decay_samples + sustain_samples, total_samples)
+            envelope[decay_end:sustain_end] = sustain_level
+
+            # Release
+            if sustain_end < total_samples:
+                envelope[sustain_end:] = np.linspace(sustain_level, 0, total_samples - sustain_end, dtype=np.float32)
+
+    envelope.flags.writeable = False
+    return envelope
 
 class ADSREnvelope:
     def __init__(self, attack_ms, decay_ms, sustain_level, release_ms):
@@ -82,63 +100,48 @@ class ADSREnvelope:
         self.sustain_level = sustain_level
         self.release_ms = release_ms
 
-    def apply(self, signal, sample_rate, duration_ms):
-        total_samples = len(signal)
-        attack_samples = int(self.attack_ms * sample_rate / 1000)
-        decay_samples = int(self.decay_ms * sample_rate / 1000)
-        release_samples = int(self.release_ms * sample_rate / 1000)
-
-        # Calculate sustain samples based on the duration
-        sustain_samples = total_samples - attack_samples - decay_samples - release_samples
-
-        # Ensure sustain is not negative
-        sustain_samples = max(0, sustain_samples)
-
-        envelope = np.zeros(total_samples)
+    def params(self):
+        return ["adsr", self.attack_ms, self.decay_ms, self.sustain_level, self.release_ms]
 
-        # Attack
-        attack_end = min(attack_samples, total_samples)
-        envelope[:attack_end] = np.linspace(0, 1, attack_end)
+    def envelope(self, sample_rate, total_samples):
+        return _envelope(self.attack_ms, self.decay_ms, self.sustain_level, self.release_ms, sample_rate, total_samples)
 
-        if attack_end < total_samples:
-            # Decay
-            decay_end = min(attack_samples + decay_samples, total_samples)
-            envelope[attack_end:decay_end] = np.linspace(1, self.sustain_level, decay_end - attack_end)
-
-            if decay_end < total_samples:
-                # Sustain
-                sustain_end = min(attack_samples + decay_samples + sustain_samples, total_samples)
-                envelope[decay_end:sustain_end] = self.sustain_level
-
-                # Release
-                if sustain_end < total_samples:
-                    envelope[sustain_end:] = np.linspace(self.sustain_level, 0, total_samples - sustain_end)
-
-        return signal * envelope
+    def apply(self, signal, sample_rate, duration_ms):
+        return signal * self.envelope(sample_rate, len(signal))
 
 class WaveGenerator(ABC):
+    # Returns the waveform for an array of phases (in radians), of any shape
     @abstractmethod
-    def generate(self, frequency, duration_ms, sample_rate):
+    def wave(self, phase):
         pass
 
-class SineGenerator(WaveGenerator):
     def generate(self, frequency, duration_ms, sample_rate):
-        t = np.linspace(0, duration_ms / 1000, int(sample_rate * duration_ms / 1000), False)
-        return np.sin(2 * np.pi * frequency * t)
+        t = np.arange(int(sample_rate * duration_ms / 1000), dtype=np.float32) / sample_rate
+        return self.wave(np.float32(2 * np.pi * frequency) * t)
+
+    # Everything that changes the generated wave, used as a cache key
+    def params(self):
+        return [self.__class__.__name__]
+
+class SineGenerator(WaveGenerator):
+    def wave(self, phase):
+        return np.sin(phase, out=np.empty_like(phase))
 
 class SquareGenerator(WaveGenerator):
     def __init__(self, duty_cycle=0.5):
         self.duty_cycle = duty_cycle
 
-    def generate(self, frequency, duration_ms, sample_rate):
-        t = np.linspace(0, duration_ms / 1000, int(sample_rate * duration_ms / 1000), False)
+    def params(self):
+        return [self.__class__.__name__, self.duty_cycle]
 
+    def wave(self, phase):
         # Generate a square wave using np.sign of a sine wave
-        wave = np.sign(np.sin(2 * np.pi * frequency * t) - (2 * self.duty_cycle - 1))
+        wave = np.sin(phase, out=np.empty_like(phase))
+        wave -= np.float32(2 * self.duty_cycle - 1)
+        np.sign(wave, out=wave)
 
         # Normalize to range [-1, 1]
-        wave = wave / 2
-
+        wave *= np.float32(0.5)
         return wave
 
 class Note:
@@ -148,6 +151,13 @@ class Note:
         self.adsr = adsr
         self.generator = generator
 
+    def params(self):
+        return ["note", self.frequency, self.duration_ms, self.adsr.params(), self.generator.params()]
+
+    # Number of samples including the release
+    def length(self, sample_rate):
+        return int((self.duration_ms + self.adsr.release_ms) * sample_rate / 1000)
+
     def generate(self, sample_rate):
         # Include release time in the total duration
         total_duration_ms = self.duration_ms + self.adsr.release_ms
@@ -155,59 +165,170 @@ class Note:
         return self.adsr.apply(wave, sample_rate, self.duration_ms)
 
 class Melody:
-    def __init__(self, sample_rate=44100):
+    # Without a sample rate the melody is rendered at the output rate
+    def __init__(self, sample_rate=None):
         self.notes = []
-        self.sample_rate = sample_rate
+        self.sample_rate = sample_rate if sample_rate is not None else output_sample_rate()
 
     def add_note(self, note, start_time_ms):
         self.notes.append((note, start_time_ms))
 
-    def generate_sound(self):
-        # Generate the melody
-        samples = self.generate()
-        # Normalize to 16-bit range
-        samples = (samples * 32767).astype(np.int16)
-
-        return sndarray.make_sound(samples)
-
-    def generate(self):
+    # Number of samples up to the end of the last release
+    def length(self):
         if not self.notes:
-            return np.array([])
-
-        # Find the end time of the last note, including release time
-        end_time_ms = max(start_time + note.duration_ms + note.adsr.release_ms 
+            return 0
+        end_time_ms = max(start_time + note.duration_ms + note.adsr.release_ms
                           for note, start_time in self.notes)
-        total_samples = int(end_time_ms * self.sample_rate / 1000)
-
-        melody = np.zeros(total_samples)
+        return int(end_time_ms * self.sample_rate / 1000)
 
-        for note, start_time_ms in self.notes:
-            start_sample = int(start_time_ms * self.sample_rate / 1000)
-            end_sample = start_sample + int((note.duration_ms + note.adsr.release_ms) * self.sample_rate / 1000)
-            note_samples = note.generate(self.sample_rate)
-            melody[start_sample:end_sample] += note_samples[:end_sample-start_sample]
+    # Hash of everything that affects the rendered samples
+    def cache_key(self):
+        params = [PCM_CACHE_VERSION, self.sample_rate, mixer.get_init()]
+        params += [[note.params(), start_time_ms] for note, start_time_ms in self.notes]
+        return hashlib.sha256(json.dumps(params).encode()).hexdigest()
 
-        # Normalize to prevent clipping
-        max_amplitude = np.max(np.abs(melody))
-        if max_amplitude > 1:
-            melody /= max_amplitude
+    def render_pcm(self, samples=None):
+        # Generate the melody
+        if samples is None:
+            samples = self.generate()
+        # Normalize to 16-bit range
+        samples *= np.float32(32767)
+        return samples.astype(np.int16)
 
-        return melody
+    def pcm_path(self):
+        init_mixer()
+        return pcm_cache_dir() / f"{self.cache_key()}.pcm"
 
+    def generate_sound(self):
+        return generate_sounds([self])[0]
 
-if settings.tts_enabled:
-    from gtts import gTTS
-    @persistent_sound_cache
-    def tts(text, lang='en'):
-        # Use gTTS to generate speech
-        tts = gTTS(text=text, lang='en')
-        mp3_fp = BytesIO()
-        tts.write_to_fp(mp3_fp)
-        mp3_fp.seek(0)
+    def generate(self):
+        return render_melodies([self])[0]
 
-        # Create an in-memory file-like object
-        in_memory_file = BytesIO(mp3_fp.getvalue())
+    # Renders the melody into 'out' (float32, at least length() samples).
+    # All notes are synthesized together: one phase matrix with a row per
+    # note, one waveform call per generator and cached envelopes.
+    def render_into(self, out):
+        out[:] = 0
+        if not self.notes:
+            return out
+
+        sample_rate = self.sample_rate
+        lengths = [note.length(sample_rate) for note, _ in self.notes]
+        starts = [int(start_time_ms * sample_rate / 1000) for _, start_time_ms in self.notes]
+        width = max(lengths)
+
+        t = np.arange(width, dtype=np.float32) / np.float32(sample_rate)
+        frequencies = np.array([note.frequency for note, _ in self.notes], dtype=np.float32)
+        phase = np.multiply.outer(np.float32(2 * np.pi) * frequencies, t)
+
+        # One vectorized waveform call per distinct generator
+        waves = np.empty_like(phase)
+        groups = {}
+        for i, (note, _) in enumerate(self.notes):
+            groups.setdefault(json.dumps(note.generator.params()), (note.generator, []))[1].append(i)
+        for generator, rows in groups.values():
+            waves[rows] = generator.wave(phase[rows])
+
+        for i, (note, _) in enumerate(self.notes):
+            length = lengths[i]
+            row = waves[i, :length]
+            row *= note.adsr.envelope(sample_rate, length)
+            end = min(starts[i] + length, len(out))
+            out[starts[i]:end] += row[:end - starts[i]]
 
-        # Load the in-memory file as a Pygame sound object
-        sound = mixer.Sound(in_memory_file)
-        return sound
+        # Normalize to prevent clipping
+        max_amplitude = max(float(out.max()), -float(out.min()))
+        if max_amplitude > 1:
+            out /= np.float32(max_amplitude)
+
+        return out
+
+
+# Renders many melodies into a single preallocated buffer and returns a
+# float32 view per melody
+def render_melodies(melodies):
+    lengths = [melody.length() for melody in melodies]
+    buffer = np.empty(sum(lengths), dtype=np.float32)
+    views = []
+    offset = 0
+    for melody, length in zip(melodies, lengths):
+        views.append(melody.render_into(buffer[offset:offset + length]))
+        offset += length
+    return views
+
+# The rendered PCM of each melody is cached on disk as raw int16 and
+# memory-mapped on later calls, so it is only synthesized again when the
+# notes or envelopes change. Melodies missing from the cache are rendered
+# together in one batch.
+def generate_sounds(melodies):
+    init_mixer()
+    sounds = [None] * len(melodies)
+    missing = []
+    paths = [melody.pcm_path() for melody in melodies]
+    for i, path in enumerate(paths):
+        if path.exists() and path.stat().st_size > 0:
+            samples = np.memmap(path, dtype=np.int16, mode="r")
+            sounds[i] = sndarray.make_sound(samples)
+        else:
+            missing.append(i)
+
+    rendered = render_melodies([melodies[i] for i in missing])
+    for i, samples in zip(missing, rendered):
+        pcm = melodies[i].render_pcm(samples)
+        try:
+            paths[i].parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = paths[i].with_suffix(f".{os.getpid()}.tmp")
+            pcm.tofile(tmp_path)
+            os.replace(tmp_path, paths[i])
+        except OSError as e:
+            logging.info("Could not cache chime samples: %s", e)
+        sounds[i] = sndarray.make_sound(pcm)
+
+    return sounds
+
+
+tts_cache = SoundCache(
+    default_cache_dir(),
+    max_bytes=settings.sound.tts_cache_max_mb * 1024 * 1024,
+    memory_items=settings.sound.tts_memory_cache_size,
+)
+remove_legacy_cache()
+
+_backend = None
+_backend_lock = Lock()
+
+def tts_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(
+                settings.sound.tts_backend,
+                command=settings.sound.tts_command,
+                workers=settings.sound.tts_workers,
+            )
+        return _backend
+
+def tts(text, lang='en'):
+    init_mixer()
+    # The backend is part of the cache key, so switching engines re-synthesizes
+    return _tts(text, lang=lang, backend=tts_backend().name)
+
+# Renders a phrase into the disk cache ahead of time, without keeping it in
+# memory. Returns False if it was already cached.
+def presynthesize(text, lang='en'):
+    init_mixer()
+    backend = tts_backend()
+    key = tts_cache.key(_tts.__name__, text, lang=lang, backend=backend.name)
+    if tts_cache.contains(key):
+        return False
+    audio = backend.synthesize(text, lang=lang)
+    tts_cache.put(key, mixer.Sound(BytesIO(audio)), remember=False)
+    return True
+
+@tts_cache.cached
+def _tts(text, lang='en', backend=None):
+    audio = tts_backend().synthesize(text, lang=lang)
+
+    # Load the encoded audio as a Pygame sound object
+    return mixer.Sound(BytesIO(audio))
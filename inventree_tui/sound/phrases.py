@@ -0,0 +1,23 @@
+from typing import List
+
+# Spoken phrases, shared by the tabs and the pre-synthesis worker so that
+# pre-rendered speech has the same cache key as the phrase played later
+
+ADJUST_VERBS = {
+    "add": "Adding to",
+    "remove": "Removing from",
+    "count": "Counting",
+}
+
+def destination_set(location_name: str) -> str:
+    return f"Destination set to {location_name}"
+
+def item_added(part_name: str) -> str:
+    return f"Added {part_name}"
+
+def adjusting(method: str, part_name: str) -> str:
+    return f"{ADJUST_VERBS[method]} {part_name}"
+
+# Everything that may be said about a part
+def part_phrases(part_name: str) -> List[str]:
+    return [item_added(part_name)] + [adjusting(method, part_name) for method in ADJUST_VERBS]
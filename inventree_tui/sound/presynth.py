@@ -0,0 +1,141 @@
+import logging
+import time
+from collections import OrderedDict
+from threading import Condition, Thread
+from typing import Callable, Iterable
+
+# Background worker rendering phrases that are likely to be spoken soon
+# (part and location names the app already knows) into the text-to-speech
+# cache, so they play without waiting on synthesis the first time.
+# The newest suggestions are rendered first, one at a time, and only after
+# is_busy() has been false for idle_seconds (no API requests or speech in
+# flight). After each phrase it sleeps long enough to keep synthesis under
+# cpu_fraction of the time, and it stops once the cache holds max_bytes.
+# The last max_pending phrases handled are remembered and not suggested
+# again; older ones are only checked against the cache.
+class PreSynthesizer(Thread):
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+        synthesize: Callable[[str], bool],
+        cache_bytes: Callable[[], int],
+        cpu_fraction: float = 0.25,
+        max_bytes: int = 0,
+        max_pending: int = 500,
+        idle_seconds: float = 1.0,
+    ):
+        super().__init__(name="tts-presynth", daemon=True)
+        # Renders a phrase, returns False if it was already cached
+        self.synthesize = synthesize
+        self.cache_bytes = cache_bytes
+        self.is_busy : Callable[[], bool] = lambda: False
+        self.cpu_fraction = cpu_fraction
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self.idle_seconds = idle_seconds
+        self.synthesized = 0
+        self.skipped = 0
+        self.failed = 0
+        self._pending : OrderedDict[str, None] = OrderedDict()
+        self._seen : OrderedDict[str, None] = OrderedDict()
+        self._cond = Condition()
+        self._stopped = False
+
+    def suggest(self, phrases: Iterable[str]):
+        with self._cond:
+            for phrase in phrases:
+                if phrase in self._seen:
+                    self._seen.move_to_end(phrase)
+                    continue
+                self._pending[phrase] = None
+                self._pending.move_to_end(phrase)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _wait(self, seconds: float) -> bool:
+        with self._cond:
+            if not self._stopped:
+                self._cond.wait(seconds)
+            return not self._stopped
+
+    def _wait_until_idle(self) -> bool:
+        idle_since = None
+        while not self._stopped:
+            if self.is_busy():
+                idle_since = None
+            elif idle_since is None:
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= self.idle_seconds:
+                return True
+            self._wait(min(0.1, self.idle_seconds))
+        return False
+
+    # Called with the lock held
+    def _remember(self, phrases: Iterable[str]):
+        for phrase in phrases:
+            self._seen[phrase] = None
+            self._seen.move_to_end(phrase)
+        while len(self._seen) > self.max_pending:
+            self._seen.popitem(last=False)
+
+    def _cache_full(self) -> bool:
+        return self.max_bytes > 0 and self.cache_bytes() >= self.max_bytes
+
+    def run(self):
+        while True:
+            with self._cond:
+                while len(self._pending) == 0 and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+            if not self._wait_until_idle():
+                return
+
+            with self._cond:
+                if len(self._pending) == 0:
+                    continue
+                phrase, _ = self._pending.popitem(last=True)
+                self._remember([phrase])
+
+            if self._cache_full():
+                # Leave the rest of the budget to phrases that are actually played
+                with self._cond:
+                    self.skipped += len(self._pending) + 1
+                    self._remember(self._pending)
+                    self._pending.clear()
+                logging.info("Text-to-speech cache is full, pausing pre-synthesis")
+                continue
+
+            start = time.monotonic()
+            try:
+                rendered = self.synthesize(phrase)
+            except Exception as e:
+                self.failed += 1
+                logging.info("Failed to pre-synthesize '%s': %s", phrase, e)
+                continue
+            if not rendered:
+                self.skipped += 1
+                continue
+            self.synthesized += 1
+
+            elapsed = time.monotonic() - start
+            if 0 < self.cpu_fraction < 1:
+                self._wait(elapsed * (1 - self.cpu_fraction) / self.cpu_fraction)
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "synthesized": self.synthesized,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+    def log_stats(self):
+        logging.info("Pre-synthesis stats: %s", self.stats())
@@ -0,0 +1,373 @@
+import heapq
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Condition, Lock, Thread
+from typing import Any, Callable, Dict, List
+
+# Lower values play first
+CHIME_PRIORITIES = {"failure": 0, "success": 1}
+SPEECH_PRIORITY = 2
+
+CHIME_CHANNEL = 0
+SPEECH_CHANNEL = 1
+
+# How often to check whether a chime queued on the channel has started
+QUEUED_CHIME_POLL_SECONDS = 0.005
+
+@dataclass(order=True)
+class Cue:
+    priority: int
+    seq: int
+    created: float = field(compare=False)
+    name: str | None = field(compare=False, default=None)
+    fn: Callable[[], Any] | None = field(compare=False, default=None)
+    key: str | None = field(compare=False, default=None)
+    # Synthesized speech, set once fn has run
+    sounds: List[Any] | None = field(compare=False, default=None)
+    # Chime played instead if the speech misses its deadline
+    fallback: str | None = field(compare=False, default=None)
+    deadline: float | None = field(compare=False, default=None)
+    # When the scan (or other input) that caused the cue was submitted
+    origin: float | None = field(compare=False, default=None)
+
+    def is_speech(self) -> bool:
+        return self.fn is not None
+
+# Single thread owning all audio playback.
+# Cues wait in a bounded priority queue (failure chimes before success
+# chimes before speech). Speech is synthesized by up to synth_workers
+# background workers and dropped if a newer cue with the same key was
+# submitted meanwhile, if newer speech has already started, or if it got
+# older than stale_seconds. Speech that is not ready within budget_seconds
+# is dropped too, and the cue's fallback chime (if any) is played in its
+# place. Playback uses reserved mixer channels: one for chimes and one for
+# speech, opened up front by open_channels().
+# Cues submitted with an origin (the time of the scan, from time.monotonic())
+# are timed until their audio starts, including the output buffer, and
+# compared against target_seconds. A chime queued behind a more important
+# one is timed once the channel starts it; the channel holds a single queued
+# chime, so one replaced before it started counts as dropped.
+class AudioScheduler(Thread):
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+        max_queue: int = 16,
+        stale_seconds: float = 1.5,
+        budget_seconds: float = 0,
+        num_channels: int = 8,
+        target_seconds: float = 0,
+        synth_workers: int = 1,
+    ):
+        super().__init__(name="audio-scheduler", daemon=True)
+        self.max_queue = max_queue
+        self.stale_seconds = stale_seconds
+        self.budget_seconds = budget_seconds
+        self.num_channels = num_channels
+        self.target_seconds = target_seconds
+        self.played = 0
+        self.dropped = 0
+        self.fallbacks = 0
+        self.over_target = 0
+        self.latencies : deque = deque(maxlen=200)
+        self.scan_latencies : deque = deque(maxlen=200)
+        self.output_latency = 0.0
+        self._queue : List[Cue] = []
+        self._latest : Dict[str, int] = {}
+        # Speech being synthesized, by seq
+        self._pending : Dict[int, Cue] = {}
+        self._synthesizing = 0
+        self._seq = 0
+        # Seq of the speech that started last
+        self._speech_seq = 0
+        self._cond = Condition()
+        self._stopped = False
+        self._synth = ThreadPoolExecutor(max_workers=synth_workers, thread_name_prefix="tts")
+        self._channels = None
+        self._channels_lock = Lock()
+        # Priority of the chime playing, and the cue of the chime queued behind it
+        self._chime_priority = None
+        self._queued_chime : Cue | None = None
+
+    def submit(self,
+        name: str | None = None,
+        fn: Callable[[], Any] | None = None,
+        key: str | None = None,
+        origin: float | None = None,
+        fallback: str | None = None,
+    ):
+        now = time.monotonic()
+        with self._cond:
+            cues = []
+            if name is not None:
+                priority = CHIME_PRIORITIES.get(name, SPEECH_PRIORITY)
+                cues.append(Cue(priority, self._next_seq(), now, name=name, key=key, origin=origin))
+            if fn is not None:
+                deadline = now + self.budget_seconds if self.budget_seconds > 0 else None
+                # A cue with a chime needs no fallback
+                fallback = fallback if name is None else None
+                cues.append(Cue(SPEECH_PRIORITY, self._next_seq(), now,
+                    fn=fn, key=key, fallback=fallback, deadline=deadline, origin=origin))
+            if key is not None and len(cues) > 0:
+                self._latest[key] = cues[-1].seq
+            for cue in cues:
+                self._push(cue)
+            self._cond.notify()
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def _push(self, cue: Cue):
+        heapq.heappush(self._queue, cue)
+        if len(self._queue) > self.max_queue:
+            # Drop the least important (and newest among equals) cue
+            worst = max(self._queue)
+            self._queue.remove(worst)
+            heapq.heapify(self._queue)
+            self.dropped += 1
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._synth.shutdown(wait=False, cancel_futures=True)
+
+    def _is_stale(self, cue: Cue) -> bool:
+        if not cue.is_speech():
+            return False
+        if cue.key is not None and self._latest.get(cue.key, cue.seq) > cue.seq:
+            return True
+        return time.monotonic() - cue.created > self.stale_seconds
+
+    def _next_deadline(self) -> float | None:
+        deadlines = [cue.deadline for cue in self._pending.values()]
+        return min(deadlines) if len(deadlines) > 0 else None
+
+    def _wait_timeout(self) -> float | None:
+        deadline = self._next_deadline()
+        timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+        if self._queued_chime is not None:
+            timeout = QUEUED_CHIME_POLL_SECONDS if timeout is None else min(timeout, QUEUED_CHIME_POLL_SECONDS)
+        return timeout
+
+    # Removes the speech that missed its deadline and returns the fallback chimes
+    def _expire(self) -> List[Cue]:
+        now = time.monotonic()
+        fallbacks = []
+        for seq, cue in list(self._pending.items()):
+            if cue.deadline <= now:
+                del self._pending[seq]
+                self.dropped += 1
+                if cue.fallback is not None and not self._is_stale(cue):
+                    self.fallbacks += 1
+                    priority = CHIME_PRIORITIES.get(cue.fallback, SPEECH_PRIORITY)
+                    fallbacks.append(Cue(priority, cue.seq, cue.created, name=cue.fallback, origin=cue.origin))
+        return fallbacks
+
+    def run(self):
+        while True:
+            cue = None
+            with self._cond:
+                while len(self._queue) == 0 and not self._stopped:
+                    self._check_queued_chime()
+                    timeout = self._wait_timeout()
+                    if timeout == 0.0:
+                        break
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                expired = self._expire()
+                if len(self._queue) > 0:
+                    cue = heapq.heappop(self._queue)
+                    if self._is_stale(cue):
+                        self.dropped += 1
+                        cue = None
+                if cue is not None and cue.is_speech() and cue.sounds is None:
+                    if cue.deadline is not None:
+                        self._pending[cue.seq] = cue
+                    self._synthesizing += 1
+                    self._synth.submit(self._synthesize, cue)
+                    cue = None
+
+            for c in expired + ([cue] if cue is not None else []):
+                try:
+                    self._play(c)
+                except Exception as e:
+                    logging.warning("Failed to play sound: %s", e)
+
+    # Runs on the synthesis worker, the cue is queued again once it is ready
+    def _synthesize(self, cue: Cue):
+        try:
+            self._synthesize_cue(cue)
+        finally:
+            with self._cond:
+                self._synthesizing -= 1
+
+    def _synthesize_cue(self, cue: Cue):
+        with self._cond:
+            # Skip the work if the cue was superseded while waiting
+            if self._is_stale(cue):
+                self._pending.pop(cue.seq, None)
+                self.dropped += 1
+                return
+        try:
+            result = cue.fn()
+        except Exception as e:
+            logging.warning("Failed to synthesize speech: %s", e)
+            return
+        if result is None:
+            return
+        cue.sounds = result if isinstance(result, list) else [result]
+        with self._cond:
+            if cue.deadline is not None and self._pending.pop(cue.seq, None) is None:
+                # Too late, the fallback chime has already played. The
+                # phrase is cached by now, so it will be on time next time.
+                return
+            self._push(cue)
+            self._cond.notify()
+
+    # Opens the mixer and the reserved channels, so the first cue does not
+    # pay for it. Safe to call from any thread.
+    def open_channels(self):
+        # pylint: disable=import-outside-toplevel
+        from pygame import mixer
+        from .generation import init_mixer, output_latency
+        with self._channels_lock:
+            if self._channels is not None:
+                return
+            init_mixer()
+            mixer.set_num_channels(max(2, self.num_channels))
+            # Keep the reserved channels out of Sound.play()'s automatic pick
+            mixer.set_reserved(2)
+            self.output_latency = output_latency()
+            self._channels = [mixer.Channel(CHIME_CHANNEL), mixer.Channel(SPEECH_CHANNEL)]
+
+    def _play(self, cue: Cue):
+        # pylint: disable=import-outside-toplevel
+        from . import chime, NullSound
+        if self._channels is None:
+            self.open_channels()
+
+        if cue.is_speech():
+            sounds = [s for s in cue.sounds if not isinstance(s, NullSound)]
+            if len(sounds) == 0:
+                return
+            if cue.seq < self._speech_seq:
+                # Synthesized after newer speech, which must not be cut off
+                with self._cond:
+                    self.dropped += 1
+                return
+            self._speech_seq = cue.seq
+            # Newer speech replaces whatever is still being said
+            channel = self._channels[SPEECH_CHANNEL]
+            channel.play(sounds[0])
+            for sound in sounds[1:]:
+                channel.queue(sound)
+        else:
+            sound = chime(cue.name)
+            if isinstance(sound, NullSound):
+                return
+            channel = self._channels[CHIME_CHANNEL]
+            self._check_queued_chime()
+            if channel.get_busy() and self._chime_priority is not None and self._chime_priority < cue.priority:
+                # Let a more important chime finish first
+                self._drop_queued_chime()
+                channel.queue(sound)
+                self._queued_chime = cue
+                return
+            # Playing also clears the channel's queue
+            self._drop_queued_chime()
+            channel.play(sound)
+            self._chime_priority = cue.priority
+
+        self._record_played(cue)
+
+    def _drop_queued_chime(self):
+        if self._queued_chime is not None:
+            self._queued_chime = None
+            with self._cond:
+                self.dropped += 1
+
+    # Counts the queued chime as played once the channel has started it
+    def _check_queued_chime(self):
+        cue = self._queued_chime
+        if cue is None or self._channels[CHIME_CHANNEL].get_queue() is not None:
+            return
+        self._queued_chime = None
+        self._chime_priority = cue.priority
+        self._record_played(cue)
+
+    def _record_played(self, cue: Cue):
+        self.played += 1
+        now = time.monotonic()
+        self.latencies.append(now - cue.created)
+        if cue.origin is not None:
+            self._record_scan_latency(cue, now - cue.origin + self.output_latency)
+
+    def _record_scan_latency(self, cue: Cue, latency: float):
+        self.scan_latencies.append(latency)
+        if self.target_seconds > 0 and latency > self.target_seconds:
+            self.over_target += 1
+            logging.info("Sound '%s' started %.1f ms after the scan (target %.0f ms)",
+                cue.name or cue.key or "speech", latency * 1000, self.target_seconds * 1000)
+
+    def queue_length(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    # Whether sounds are waiting or speech is being synthesized
+    def busy(self) -> bool:
+        with self._cond:
+            return len(self._queue) > 0 or self._synthesizing > 0
+
+    def stats(self) -> Dict[str, int | float]:
+        def percentile(samples, p):
+            samples = sorted(samples)
+            if len(samples) == 0:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+        return {
+            "queue_length": self.queue_length(),
+            "played": self.played,
+            "dropped": self.dropped,
+            "fallbacks": self.fallbacks,
+            "latency_p50_ms": percentile(self.latencies, 0.5),
+            "latency_p95_ms": percentile(self.latencies, 0.95),
+            "output_latency_ms": self.output_latency * 1000,
+            "scan_to_sound_p50_ms": percentile(self.scan_latencies, 0.5),
+            "scan_to_sound_p95_ms": percentile(self.scan_latencies, 0.95),
+            "over_target": self.over_target,
+        }
+
+    def log_stats(self):
+        logging.info("Audio scheduler stats: %s", self.stats())
+
+
+audio_scheduler : AudioScheduler | None = None
+
+def start_scheduler(
+    max_queue: int = 16,
+    stale_seconds: float = 1.5,
+    budget_seconds: float = 0,
+    num_channels: int = 8,
+    target_seconds: float = 0,
+    synth_workers: int = 1,
+) -> AudioScheduler:
+    global audio_scheduler
+    audio_scheduler = AudioScheduler(
+        max_queue=max_queue,
+        stale_seconds=stale_seconds,
+        budget_seconds=budget_seconds,
+        num_channels=num_channels,
+        target_seconds=target_seconds,
+        synth_workers=synth_workers,
+    )
+    audio_scheduler.start()
+    return audio_scheduler
+
+def stop_scheduler():
+    if audio_scheduler is not None:
+        audio_scheduler.log_stats()
+        audio_scheduler.stop()
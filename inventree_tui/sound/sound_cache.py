@@ -0,0 +1,178 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import RLock
+from typing import Dict
+
+from pygame import mixer
+
+def default_cache_dir() -> Path:
+    return Path(os.path.expanduser("~")) / ".cache" / "inventree-tui" / "sounds"
+
+# Removes the WAV files and pickled index written by the old cache
+def remove_legacy_cache():
+    legacy_dir = Path(tempfile.gettempdir()) / "inventree-tui" / "sounds"
+    if not legacy_dir.is_dir():
+        return
+    for path in list(legacy_dir.glob("sound_*.wav")) + [legacy_dir / "sound_cache_index.pkl"]:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+# Two level cache of generated pygame sounds.
+# Decoded Sound objects are kept in an in-memory LRU, backed by a
+# content-addressed directory of raw PCM files (named after the hash of their
+# samples) and a SQLite index mapping cache keys to files. The directory is
+# kept under max_bytes by evicting the least recently used entries.
+class SoundCache():
+    def __init__(self, directory: Path, max_bytes: int = 64 * 1024 * 1024, memory_items: int = 64):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory : OrderedDict[str, mixer.Sound] = OrderedDict()
+        self._lock = RLock()
+        self._conn = sqlite3.connect(self.directory / "index.sqlite3", check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    # Keys include the mixer format, since raw samples only play back
+    # correctly with the format they were decoded for
+    @staticmethod
+    def key(*args, **kwargs) -> str:
+        params = [mixer.get_init(), args, sorted(kwargs.items())]
+        return hashlib.sha256(json.dumps(params, default=str).encode()).hexdigest()
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.pcm"
+
+    def _remember(self, key: str, sound: mixer.Sound):
+        self._memory[key] = sound
+        self._memory.move_to_end(key)
+        while self.memory_items > 0 and len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> mixer.Sound | None:
+        with self._lock:
+            sound = self._memory.get(key)
+            if sound is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return sound
+
+            row = self._conn.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                try:
+                    sound = mixer.Sound(buffer=self._path(row[0]).read_bytes())
+                except OSError:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    sound = None
+            if sound is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.disk_hits += 1
+            self._remember(key, sound)
+            return sound
+
+    # Whether the key is cached, without loading it or counting a lookup
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            if key in self._memory:
+                return True
+            return self._conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    # remember=False only writes the sound to disk, e.g. for pre-synthesized
+    # phrases that should not push played ones out of memory
+    def put(self, key: str, sound: mixer.Sound, remember: bool = True):
+        data = sound.get_raw()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            if remember:
+                self._remember(key, sound)
+            try:
+                if not path.exists():
+                    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+                    tmp_path.write_bytes(data)
+                    os.replace(tmp_path, path)
+            except OSError as e:
+                logging.info("Could not store sound in the cache: %s", e)
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, digest, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, digest, len(data), time.time())
+            )
+            self._evict()
+
+    # Entries sharing a file count once
+    def disk_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)"
+            ).fetchone()[0]
+
+    def _evict(self):
+        if self.max_bytes <= 0:
+            return
+        total = self.disk_bytes()
+        while total > self.max_bytes:
+            row = self._conn.execute("SELECT key, digest, size FROM entries ORDER BY accessed LIMIT 1").fetchone()
+            if row is None:
+                break
+            key, digest, size = row
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            shared = self._conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+            if shared is None:
+                self._path(digest).unlink(missing_ok=True)
+                total -= size
+
+    def stats(self) -> Dict[str, int | float]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            return {
+                "memory_items": len(self._memory),
+                "disk_entries": entries,
+                "disk_bytes": size,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups > 0 else 0.0,
+            }
+
+    def log_stats(self):
+        logging.info("Sound cache stats: %s", self.stats())
+
+    # Decorator caching the sound returned by func for each set of arguments
+    def cached(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = self.key(func.__name__, *args, **kwargs)
+            sound = self.get(key)
+            if sound is None:
+                sound = func(*args, **kwargs)
+                self.put(key, sound)
+            return sound
+        return wrapper
@@ -0,0 +1,100 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import List
+
+# Local engines tried, in order, when no command is configured.
+# Placeholders: {text}, {lang} and {output} (a temporary WAV file; without
+# it the engine has to write the audio to stdout). "--" keeps text starting
+# with a dash from being read as an option.
+DEFAULT_COMMANDS = [
+    ["espeak-ng", "-v", "{lang}", "--stdout", "--", "{text}"],
+    ["espeak", "-v", "{lang}", "--stdout", "--", "{text}"],
+    ["pico2wave", "-l", "en-US", "-w", "{output}", "--", "{text}"],
+]
+
+class TTSError(Exception):
+    pass
+
+# Turns text into encoded audio (WAV, MP3, ...) that pygame can load
+class TTSBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    def synthesize(self, text: str, lang: str = "en") -> bytes:
+        pass
+
+    def close(self):
+        pass
+
+# Google Translate text-to-speech, needs an internet connection
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+
+    def synthesize(self, text: str, lang: str = "en") -> bytes:
+        # gTTS is only imported once a phrase has to be synthesized
+        # pylint: disable=import-outside-toplevel
+        from gtts import gTTS
+
+        mp3_fp = BytesIO()
+        gTTS(text=text, lang=lang).write_to_fp(mp3_fp)
+        return mp3_fp.getvalue()
+
+# Offline synthesis with a command line engine (espeak-ng, pico2wave, ...).
+# Commands run in a small pool of worker threads, one process per phrase.
+class CommandBackend(TTSBackend):
+    name = "local"
+
+    def __init__(self, command: List[str], workers: int = 2, timeout_seconds: float = 10):
+        self.command = command
+        self.timeout_seconds = timeout_seconds
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-command")
+
+    @staticmethod
+    def available(command: List[str]) -> bool:
+        return len(command) > 0 and shutil.which(command[0]) is not None
+
+    def _run(self, text: str, lang: str) -> bytes:
+        output = None
+        if any("{output}" in arg for arg in self.command):
+            fd, output = tempfile.mkstemp(suffix=".wav", prefix="inventree-tui-tts-")
+            os.close(fd)
+        try:
+            args = [arg.format(text=text, lang=lang, output=output) for arg in self.command]
+            result = subprocess.run(args, capture_output=True, timeout=self.timeout_seconds, check=False)
+            if result.returncode != 0:
+                raise TTSError(f"{args[0]} exited with {result.returncode}: {result.stderr.decode(errors='replace').strip()}")
+            if output is not None:
+                with open(output, "rb") as f:
+                    return f.read()
+            return result.stdout
+        finally:
+            if output is not None:
+                os.unlink(output)
+
+    def synthesize(self, text: str, lang: str = "en") -> bytes:
+        return self._pool.submit(self._run, text, lang).result()
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+# Picks the backend from the settings: "local", "gtts", or "auto" (the first
+# available local engine, falling back to gTTS)
+def create_backend(backend: str = "auto", command: List[str] | None = None, workers: int = 2) -> TTSBackend:
+    if backend == "gtts":
+        return GTTSBackend()
+
+    commands = [command] if command else DEFAULT_COMMANDS
+    for candidate in commands:
+        if CommandBackend.available(candidate):
+            return CommandBackend(candidate, workers=workers)
+
+    if backend == "local":
+        raise TTSError(f"No local text-to-speech engine found (tried {', '.join(c[0] for c in commands)})")
+    logging.info("No local text-to-speech engine found, using gTTS")
+    return GTTSBackend()
@@ -0,0 +1,31 @@
+import logging
+import time
+from typing import List, Tuple
+
+# Timeline of startup milestones, enabled with `--startup-profile`.
+# Times are relative to the first import of this module, which happens
+# before any of the heavy imports in the entrypoint.
+_start = time.perf_counter()
+enabled = False
+timeline : List[Tuple[str, float]] = []
+
+def enable():
+    global enabled
+    enabled = True
+    mark("entrypoint")
+
+def mark(label: str):
+    if enabled:
+        timeline.append((label, time.perf_counter() - _start))
+
+def report() -> str:
+    lines = ["Startup timeline:"]
+    previous = 0.0
+    for label, t in timeline:
+        lines.append(f"  {t * 1000:8.1f} ms  (+{(t - previous) * 1000:7.1f} ms)  {label}")
+        previous = t
+    return "\n".join(lines)
+
+def log_report():
+    if enabled:
+        logging.info(report())
@@ -12,3 +12,23 @@ class StatusChanged(Event):
     def control(self) -> Widget | App:
         """Alias for self.source."""
         return self.source
+
+@dataclass
+class QueueDepthChanged(Event):
+    source: Widget | App
+    depth: int
+
+    @property
+    def control(self) -> Widget | App:
+        """Alias for self.source."""
+        return self.source
+
+@dataclass
+class ConnectionStateChanged(Event):
+    source: Widget | App
+    state: str
+
+    @property
+    def control(self) -> Widget | App:
+        """Alias for self.source."""
+        return self.source
@@ -2,6 +2,7 @@ from typing import cast
 
 from inventree.stock import StockItem
 
+from textual import work
 from textual.app import ComposeResult
 from textual.containers import Container, Horizontal
 from textual.reactive import reactive
@@ -86,15 +87,27 @@ class CheckInItemsTab(Container):
 
     def on_inventree_scanner_item_scanned(self, message: InventreeScanner.ItemScanned) -> None:
         if message.sender.id == "checkin_items_scanner":
-            item = CachedStockItem(stock_item=message.obj)
-            if item.default_location is None:
-                errmsg = f"Cannot check-in Stock #{item.pk}: No default location"
-                self.post_message(StatusChanged(self, errmsg))
-                event = IgnorableErrorEvent(self, "Check-In Error", errmsg)
-                self.post_message(event)
-                return
+            self.prepare_check_in(message.obj)
+
+    # Resolves the part and locations off the UI thread, so that the
+    # check-in dialog can be opened without making any network calls
+    @work(exclusive=False, thread=True)
+    def prepare_check_in(self, stock_item: StockItem) -> None:
+        item = CachedStockItem(stock_item=stock_item)
+        try:
+            item.prefetch()
+        except Exception as e:
+            self.post_message(IgnorableErrorEvent(self, "Check-In Error", str(e)))
+            return
+
+        if item.default_location is None:
+            errmsg = f"Cannot check-in Stock #{item.pk}: No default location"
+            self.post_message(StatusChanged(self, errmsg))
+            event = IgnorableErrorEvent(self, "Check-In Error", errmsg)
+            self.post_message(event)
+            return
 
-            self.open_check_in_dialog(item)
+        self.app.call_from_thread(self.open_check_in_dialog, item)
 
     def open_check_in_dialog(self, item):
         dialog = CheckInScreen(item)
@@ -91,9 +91,9 @@ class PartSearchTab(Container):
         message = f"Search found {len(parts)} part{'s' if len(parts) != 1 else ''}"
         self.post_message(StatusChanged(self, message))
         def sound_fn():
-            tts(message).play()
+            return tts(message)
 
-        self.post_message(Sound(self, fn=sound_fn))
+        self.post_message(Sound(self, fn=sound_fn, key="part-search", fallback="success"))
         max_expanded = settings.part_search_tab.auto_expand
         for i, part in enumerate(parts):
             tree.add_part(part, expand = i < max_expanded)
@@ -1,12 +1,14 @@
 from __future__ import annotations
-from typing import cast, Generic, TypeVar, get_args, Type
+from typing import cast, Generic, TypeVar, get_args, Type, List
 from pydantic import BaseModel, ConfigDict, PrivateAttr, Field
 import logging
 from datetime import datetime, timedelta
-from threading import Semaphore
+from threading import Lock
 
+from inventree.part import Part
 from inventree.stock import StockItem, StockItemTracking
 from inventree.base import InventreeObject
+from requests.exceptions import RequestException
 
 from textual import work, on
 from textual.validation import Function, Number, ValidationResult, Validator
@@ -33,13 +35,15 @@ from inventree_tui.api import (
 )
 
 from inventree_tui.api.stock_item_tracking import CachedStockItemTracking
+from inventree_tui.api.tracking_sync import TrackingSync, HistoryBackfill
 from inventree_tui.error_screen import IgnorableErrorEvent
 from inventree_tui.status import StatusChanged
 from inventree_tui.model_data_table import ModelDataTable
 from inventree_tui.components import ButtonBar
-from inventree_tui.api import api, RowBaseModel
+from inventree_tui.api import api, object_cache, RowBaseModel, submit_stock_adjustment, writes_are_queued
 from inventree_tui.validation import GreaterThan
-from inventree_tui.sound import Sound, tts
+from inventree_tui.sound import Sound, tts, suggest_phrases
+from inventree_tui.sound.phrases import adjusting, part_phrases
 from inventree_tui.settings import settings
 
 class StockAdjustmentScreen(ModalScreen):
@@ -51,14 +55,9 @@ class StockAdjustmentScreen(ModalScreen):
         super().__init__()
         self.dialog_title = f"Adjust Stock: {self.item.title_name()} ({self.item.part.name})"
 
-        operations = {
-            "add":"Adding to",
-            "remove":"Removing from",
-            "count":"Counting",
-        }
         def sound_fn():
-            tts(f"{operations[method]} {item.part.name}").play()
-        self.post_message(Sound(self, fn=sound_fn))
+            return tts(adjusting(method, item.part.name))
+        self.post_message(Sound(self, fn=sound_fn, key="stock-adjust", fallback="success"))
 
     def compose(self) -> ComposeResult:
         with Container(id="adjust-dialog") as container:
@@ -169,9 +168,6 @@ class CachedStockItemTrackingRowModel(RowBaseModel, CachedStockItemTracking):
             timestamp = item.datetime()
         )
 
-    def load_name(self):
-        self.part_name = self.stock_item.part.name
-
     @classmethod
     def field_display_dict(cls):
         return {
@@ -282,8 +278,15 @@ class StockOpsTab(Container):
             hours=settings.stock_ops_tab.history_delta_hours,
             days=settings.stock_ops_tab.history_delta_days,
         )
-        # Limits the number of concurrent works making API calls
-        self.semaphore = Semaphore(5)
+        # Rows waiting for their part name, resolved in batches
+        self.pending_rows : List[CachedStockItemTrackingRowModel] = []
+        self.pending_lock = Lock()
+        self.resolving = False
+        # Rows whose part name could not be loaded, retried on reconnect
+        self.failed_rows : List[CachedStockItemTrackingRowModel] = []
+        # Remembers the newest history entry, so refreshes only fetch newer ones
+        self.tracking_sync = TrackingSync()
+        self.fetch_lock = Lock()
 
     def compose(self) -> ComposeResult:
         yield InventreeScanner(
@@ -309,60 +312,116 @@ class StockOpsTab(Container):
     def on_mount(self):
         self.fetch_recent()
 
-    #TODO: implement lazy loading of part names. 
-    @work(exclusive=False, thread=True)
-    async def load_row(self, row_key, row):
-        self.semaphore.acquire()
-        max_retries = 3
-        for i in range(max_retries):
-            try:
-                row.load_name();
-                break
-            except Exception as e:
-                if i+1 == max_retries:
-                    raise e
-        self.semaphore.release()
-        table = cast(ModelDataTable, self.query_one("#stock_ops_table"))
-        self.app.call_from_thread(table.update)
-        #await table.update()
+    def queue_part_name(self, row):
+        self.queue_part_names([row])
 
-    # Will fetch recent items until it starts overlapping with the data
-    # already in the table. If no data is in the table, it will fetch all of the data until
-    # it reaches the 'oldest' limit
+    def queue_part_names(self, rows):
+        with self.pending_lock:
+            self.pending_rows.extend(rows)
+            if self.resolving:
+                return
+            self.resolving = True
+        self.resolve_part_names()
+
+    # Queues the rows left "unknown" by failed lookups again
+    def retry_part_names(self):
+        with self.pending_lock:
+            rows = self.failed_rows
+            self.failed_rows = []
+        if len(rows) == 0:
+            return
+        for row in rows:
+            row.part_name = "loading..."
+        self.queue_part_names(rows)
+
+    # Resolves the part names of all queued rows with a few bulk requests,
+    # then updates the table once. Rows queued meanwhile form the next batch.
+    @work(exclusive=False, thread=True)
+    def resolve_part_names(self):
+        rows = []
+        finished = False
+        try:
+            table = cast(ModelDataTable, self.query_one("#stock_ops_table"))
+            while True:
+                with self.pending_lock:
+                    rows = self.pending_rows
+                    self.pending_rows = []
+                    if len(rows) == 0:
+                        self.resolving = False
+                        finished = True
+                        return
+
+                max_retries = 3
+                for i in range(max_retries):
+                    try:
+                        self.apply_part_names(rows)
+                        break
+                    except Exception as e:
+                        logging.warning("Failed to load part names: %s", e)
+                        if i+1 == max_retries:
+                            for row in rows:
+                                row.part_name = "unknown"
+                            with self.pending_lock:
+                                self.failed_rows.extend(rows)
+                rows = []
+                self.app.call_from_thread(table.update)
+        finally:
+            if not finished:
+                # The worker died, let the next queued row start a new one
+                with self.pending_lock:
+                    self.resolving = False
+                    self.failed_rows.extend(rows)
+
+    def apply_part_names(self, rows):
+        stock_items = object_cache.get_many(StockItem, [row.stock_pk for row in rows])
+        parts = object_cache.get_many(Part, [item.part for item in stock_items.values()])
+        for row in rows:
+            stock_item = stock_items.get(row.stock_pk)
+            part = parts.get(stock_item.part) if stock_item is not None else None
+            row.part_name = part.name if part is not None else "unknown"
+        # Parts in the recent history are the ones most likely to be handled next
+        suggest_phrases(phrase for part in parts.values() for phrase in part_phrases(part.name))
+
+    # Fetches the history entries newer than the newest one already in the table.
+    # On the first call, it backfills the history until it reaches the 'oldest' limit
     @work(exclusive=False, thread=True)
     async def fetch_recent(self, increment = settings.stock_ops_tab.history_chunk_size, oldest_delta : timedelta | None = None):
-
-        if oldest_delta is None:
-            oldest_delta = self.default_oldest_delta
-
-        table = cast(ModelDataTable, self.query_one("#stock_ops_table"))
-
-        oldest = self.creation_time - oldest_delta
-
-        most_recent = 1
-        for k,v in table.data.items():
-            most_recent = max(v.obj.pk, most_recent)
-
-        # Returns true if the fetched items did not hit most_recent, otherwise false
-        async def add_items(table, limit, offset, most_recent, oldest):
-            new_data = CachedStockItemTracking.list(api, limit=limit, offset=offset)
-            hit_most_recent = False
-            hit_oldest = False
-            for item in new_data:
-                row = CachedStockItemTrackingRowModel(item)
-                row_key = await table.add_item(row)
-                self.load_row(row_key, row)
-                if row.obj.pk  <= most_recent:
-                    hit_most_recent = True
-                if row.timestamp <= oldest:
-                    hit_oldest = True
-
-            return not (hit_most_recent or hit_oldest)
-
-        offset = 0
-        limit = increment
-        while await add_items(table, limit, offset, most_recent, oldest):
-            offset += limit
+        with self.fetch_lock:
+            table = cast(ModelDataTable, self.query_one("#stock_ops_table"))
+            try:
+                if self.tracking_sync.high_water_mark is not None:
+                    for item in self.tracking_sync.fetch_new():
+                        await self.add_row(table, item)
+                    return
+
+                if oldest_delta is None:
+                    oldest_delta = self.default_oldest_delta
+                oldest = self.creation_time - oldest_delta
+                await self.backfill(table, increment, oldest)
+            except (ConnectionError, RequestException) as e:
+                # Retried once the connection is back
+                logging.warning("Could not fetch the stock history: %s", e)
+                self.post_message(StatusChanged(self, "Stock history unavailable, not connected to the server"))
+
+    async def add_row(self, table: ModelDataTable, item: CachedStockItemTracking):
+        row = CachedStockItemTrackingRowModel(item)
+        if await table.add_item(row):
+            self.queue_part_name(row)
+        return row
+
+    async def backfill(self, table: ModelDataTable, increment: int, oldest: datetime):
+        tab_settings = settings.stock_ops_tab
+        backfill = HistoryBackfill(
+            initial_page_size=increment,
+            max_page_size=tab_settings.history_max_chunk_size,
+            target_page_seconds=tab_settings.history_target_page_ms / 1000,
+            parallel_pages=tab_settings.history_parallel_pages,
+        )
+        for page in backfill.pages(oldest):
+            self.tracking_sync.advance(page)
+            for item in page:
+                await self.add_row(table, item)
+        logging.info("History backfill took %d requests", backfill.requests)
 
 
     @work(exclusive=False, thread=True)
@@ -404,12 +463,17 @@ class StockOpsTab(Container):
             (item, method) = args
 
             try:
-                StockItem.adjustStockItems(api, method, [item])
+                submit_stock_adjustment(method, [item])
             except Exception as e:
                 event = IgnorableErrorEvent(self, "Transfer Failed", str(e))
                 self.post_message(event)
                 return
 
+            if writes_are_queued():
+                # The history is fetched again once the journal has sent it
+                self.post_message(StatusChanged(self, f"Stock item adjustment queued ({method})"))
+                return
+
             self.fetch_recent()
             self.post_message(StatusChanged(self,f"""\
 Stock item adjusted ({method})"""))
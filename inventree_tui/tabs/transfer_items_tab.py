@@ -1,3 +1,4 @@
+import logging
 from typing import cast, List
 from inventree.stock import StockItem, StockLocation
 
@@ -16,12 +17,15 @@ from inventree_tui.api import (
     CachedStockItem,
     transfer_items,
     InventreeScanner,
+    location_tree,
+    NETWORK_ERRORS,
 )
 from inventree_tui.components import LabeledText, ButtonBar, CheckboxSet
 from inventree_tui.error_screen import IgnorableErrorEvent
 from inventree_tui.status import StatusChanged
 from inventree_tui.model_data_table import ModelDataTable
-from inventree_tui.sound import Sound, tts, success, failure
+from inventree_tui.sound import Sound, tts, suggest_phrases, presynth_enabled
+from inventree_tui.sound.phrases import destination_set, item_added, part_phrases
 
 class TransferItemsTab(Container):
     destination : StockLocation | None = reactive(None)
@@ -32,7 +36,8 @@ class TransferItemsTab(Container):
             whitelist=[StockLocation],
             placeholder="Scan Location Barcode",
             input_id="transfer_destination_input",
-            autocomplete=True
+            autocomplete=True,
+            local_index=location_tree,
         )
         yield LabeledText("Destination", "None", id="destination")
         yield InventreeScanner(
@@ -66,21 +71,41 @@ class TransferItemsTab(Container):
             dest.text = self.destination.name
             self.get_destination_full_path()
 
+            name = self.destination.name
             def sound_fn():
-                tts(f"Destination set to {self.destination.name}").play()
-            self.post_message(Sound(self, fn=sound_fn))
+                return tts(destination_set(name))
+            self.post_message(Sound(self, fn=sound_fn, key="transfer-destination", fallback="success"))
+
+    def on_mount(self):
+        if presynth_enabled():
+            self.suggest_destination_phrases()
+
+    # Every known location may be scanned as the destination next
+    @work(exclusive=True, thread=True, group="presynth")
+    def suggest_destination_phrases(self):
+        try:
+            location_tree.ensure_loaded()
+        except Exception as e:
+            logging.info("Could not load locations for pre-synthesis: %s", e)
+            return
+        suggest_phrases(destination_set(location.name) for location in location_tree.all())
 
     @work(exclusive=True, thread=True)
     def get_destination_full_path(self):
         dest = self.query_one("#destination")
-        cur = self.destination
-        path = []
-        while cur is not None:
-            path = [cur.name] + path
-            cur = cur.getParentLocation()
-
-        fullpath = "/".join(path)
-        dest.text = f"{self.destination.name} ({fullpath})"
+        destination = self.destination
+        fullpath = None
+        try:
+            location_tree.ensure_loaded()
+            if destination.pk not in location_tree:
+                location_tree.add_with_ancestors(destination)
+            fullpath = location_tree.full_path(destination.pk)
+        except NETWORK_ERRORS as e:
+            logging.info("Could not resolve the path of %s: %s", destination.name, e)
+        if not fullpath:
+            # The server sends the path along with the location
+            fullpath = getattr(destination, "pathstring", None) or destination.name
+        dest.text = f"{destination.name} ({fullpath})"
 
     async def on_inventree_scanner_item_scanned(self, message: InventreeScanner.ItemScanned) -> None:
         if message.sender.id == "transfer_destination_scanner":
@@ -92,14 +117,14 @@ class TransferItemsTab(Container):
             res = await table.add_item(CachedStockItemRow(item))
             if res:
                 def sound_fn():
-                    tts(f"Added {item.part.name}").play()
-                    success.play()
-                self.post_message(Sound(self, fn=sound_fn))
+                    return tts(item_added(item.part.name))
+                self.post_message(Sound(self, name="success", fn=sound_fn, key="transfer-item", origin=message.origin))
+                # The item's part is likely to be adjusted or scanned again
+                suggest_phrases(part_phrases(item.part.name))
             else:
                 def sound_fn():
-                    tts(f"Item has already been added").play()
-                    failure.play()
-                self.post_message(Sound(self, fn=sound_fn))
+                    return tts(f"Item has already been added")
+                self.post_message(Sound(self, name="failure", fn=sound_fn, key="transfer-item", origin=message.origin))
 
     async def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "transfer_done_button":
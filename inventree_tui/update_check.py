@@ -0,0 +1,28 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+def cache_path() -> Path:
+    return Path(os.path.expanduser("~")) / ".cache" / "inventree-tui" / "update_check.json"
+
+# Returns the latest version found by a previous check, if it is recent enough
+def cached_latest_version(package_name: str, ttl_seconds: float) -> str | None:
+    try:
+        with open(cache_path(), "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("package") != package_name or time.time() - data.get("checked", 0) > ttl_seconds:
+        return None
+    return data.get("latest_version")
+
+def store_latest_version(package_name: str, latest_version: str):
+    path = cache_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"package": package_name, "latest_version": latest_version, "checked": time.time()}, f)
+    except OSError as e:
+        logging.info("Could not cache the update check: %s", e)